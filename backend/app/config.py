@@ -10,10 +10,68 @@ class Settings:
     # Correct path to the datasets directory at the project root
     upload_dir: str = os.getenv("UPLOAD_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datasets"))
 
+    # Scratch space for bulk-prediction uploads and S3 downloads
+    temp_dir: str = os.getenv("TEMP_DIR", os.path.join(upload_dir, "tmp"))
+
+    # Training-session store (used when diskcache is installed) and its size cap in bytes
+    session_dir: str = os.getenv("SESSION_DIR", os.path.join(upload_dir, "sessions"))
+    session_store_size: int = int(os.getenv("SESSION_STORE_SIZE", str(2 ** 30)))
+
+    # Include tracebacks in API error responses
+    debug: bool = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+
+    # Files in temp_dir older than temp_max_age seconds are swept every temp_sweep_interval seconds
+    temp_max_age: int = int(os.getenv("TEMP_MAX_AGE", "1800"))
+    temp_sweep_interval: int = int(os.getenv("TEMP_SWEEP_INTERVAL", "600"))
+
+    # Maximum accepted upload size in bytes (0 disables the limit)
+    max_file_size: int = int(os.getenv("MAX_FILE_SIZE", "0"))
+
+    # Processes used to parse uploads (0 = one per CPU)
+    parse_workers: int = int(os.getenv("PARSE_WORKERS", "0"))
+
+    # Threads for model training / prediction (0 = one per CPU)
+    train_workers: int = int(os.getenv("TRAIN_WORKERS", "0"))
+    predict_workers: int = int(os.getenv("PREDICT_WORKERS", "0"))
+
+    # Processes used by each hyperparameter grid search (-1 = one per CPU)
+    grid_search_jobs: int = int(os.getenv("GRID_SEARCH_JOBS", "-1"))
+
+    # Dispatch sklearn estimators to scikit-learn-intelex when it is installed.
+    # Models pickled while patched need sklearnex to be loaded again.
+    use_sklearnex: bool = os.getenv("USE_SKLEARNEX", "true").lower() in ("1", "true", "yes")
+
+    # Cores used by parallel estimators (random forests, KNN) outside grid search (-1 = all)
+    estimator_jobs: int = int(os.getenv("ESTIMATOR_JOBS", "-1"))
+
+    # On-disk cache of fitted preprocessing steps shared by the candidates of a
+    # hyperparameter grid search ("" disables it), trimmed to pipeline_cache_size bytes
+    pipeline_cache_dir: str = os.getenv("PIPELINE_CACHE_DIR", os.path.join(upload_dir, "pipeline_cache"))
+    pipeline_cache_size: int = int(os.getenv("PIPELINE_CACHE_SIZE", str(512 * 1024 * 1024)))
+
+    # Number of loaded prediction models kept in memory per process
+    model_cache_size: int = int(os.getenv("MODEL_CACHE_SIZE", "16"))
+
+    # Threads allowed to run CPU-bound EDA work at once (0 = one per CPU)
+    eda_max_threads: int = int(os.getenv("EDA_MAX_THREADS", "0"))
+
+    # Number of parsed DataFrames kept in memory per process for EDA
+    df_cache_size: int = int(os.getenv("DF_CACHE_SIZE", "8"))
+
     # AWS S3 settings
     aws_access_key_id: str = os.getenv("AWS_ACCESS_KEY_ID")
     aws_secret_access_key: str = os.getenv("AWS_SECRET_ACCESS_KEY")
     aws_region: str = os.getenv("AWS_REGION", "us-east-1")
     aws_s3_bucket: str = os.getenv("AWS_S3_BUCKET", "")
+    # Parallel connections per S3 upload/download
+    s3_max_concurrency: int = int(os.getenv("S3_MAX_CONCURRENCY", "10"))
+
+    # Gemini chatbot settings
+    gemini_api_key: str = os.getenv("GEMINI_API_KEY", "")
+    # Optional extra keys (GEMINI_API_KEY_1, GEMINI_API_KEY_2, ...) used round-robin
+    gemini_extra_api_keys: list = [v for k, v in sorted(os.environ.items()) if k.startswith("GEMINI_API_KEY_") and v]
+    gemini_max_concurrency: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+    gemini_max_attempts: int = int(os.getenv("GEMINI_MAX_ATTEMPTS", "4"))
+    gemini_backoff_base: float = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
 
 settings = Settings()
\ No newline at end of file
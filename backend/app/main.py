@@ -1,9 +1,18 @@
 import os
+import asyncio
+import contextlib
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from app.routers import datasets, eda, model_builder, chatbot
+from app.config import settings
+from app.services import storage
 
-app = FastAPI(title="ML Studio Backend")
+logger = logging.getLogger("mlstudio.main")
+
+app = FastAPI(title="ML Studio Backend", default_response_class=ORJSONResponse)
 
 # ✅ CORS configuration
 origins = [
@@ -19,19 +28,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON bodies (correlation/summary payloads are large and repetitive)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Routers
 app.include_router(datasets.router, prefix="/datasets", tags=["datasets"])
 app.include_router(eda.router, prefix="/eda", tags=["eda"])
 app.include_router(model_builder.router, prefix="/model", tags=["model"])
 app.include_router(chatbot.router, prefix="/chatbot", tags=["chatbot"])
 
+async def _sweep_temp_files():
+    # Catches temp files whose request never reached its own cleanup (e.g. a crash)
+    while True:
+        try:
+            removed = await asyncio.to_thread(storage.sweep_temp_dir, settings.temp_max_age)
+            if removed:
+                logger.info(f"Removed {removed} stale temp file(s) from {settings.temp_dir}")
+        except Exception:
+            logger.exception("Temp dir sweep failed")
+        await asyncio.sleep(settings.temp_sweep_interval)
+
+@app.on_event("startup")
+async def start_temp_sweeper():
+    app.state.temp_sweeper = asyncio.create_task(_sweep_temp_files())
+
+@app.on_event("shutdown")
+async def stop_temp_sweeper():
+    task = getattr(app.state, "temp_sweeper", None)
+    if task is not None:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await chatbot.http_client.aclose()
+
+@app.on_event("shutdown")
+def stop_worker_pools():
+    datasets.shutdown_parse_pool()
+    model_builder.shutdown_pools()
+
 @app.get("/")
 def root():
     return {"service": "ML Studio Backend", "status": "ok"}
 
 # ✅ Uvicorn entry point for local dev & Render
+# Worker count comes from UVICORN_WORKERS (or WEB_CONCURRENCY, which Render/Heroku set).
+# Each worker is a separate process: the SQLite metadata DB and the dataset files are
+# shared, and so are training sessions (services/registry.py) when diskcache is installed.
+# Without diskcache the sessions live in process memory, so a train -> save flow needs
+# sticky routing or a single worker. The EDA DataFrame cache is always per process.
+# In production prefer:
+#   gunicorn -k uvicorn.workers.UvicornWorker -w $WEB_CONCURRENCY app.main:app
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))  # Render will set $PORT
-    # reload=True is useful locally, but you can set it to False in production
+    workers = int(os.environ.get("UVICORN_WORKERS", os.environ.get("WEB_CONCURRENCY", "1")))
+    # reload=True is useful locally but cannot be combined with multiple workers
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True)
+    uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers, reload=workers == 1)
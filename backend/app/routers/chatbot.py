@@ -1,12 +1,12 @@
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel
-import requests
-import os
-from dotenv import load_dotenv
+import httpx
+import asyncio
+import itertools
+import random
 import json
 
-# This is a good practice, but the main.py should also load them.
-load_dotenv()
+from app.config import settings
 
 router = APIRouter()
 
@@ -17,14 +17,73 @@ class Message(BaseModel):
 class ChatRequest(BaseModel):
     chatHistory: list[Message]
 
-API_KEY = os.getenv("GEMINI_API_KEY", "")
+# Extra keys from settings are used round-robin to spread requests across quotas.
+API_KEYS = [k for k in [settings.gemini_api_key] + settings.gemini_extra_api_keys if k]
+_key_cycle = itertools.cycle(API_KEYS) if API_KEYS else None
+
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key={key}"
+
+# Caps in-flight Gemini calls from this process; 429/5xx are retried with jittered backoff.
+GEMINI_MAX_ATTEMPTS = settings.gemini_max_attempts
+GEMINI_BACKOFF_BASE = settings.gemini_backoff_base
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 30.0
+
+_gemini_sem = asyncio.Semaphore(settings.gemini_max_concurrency)
+
+# Shared client: keeps TLS connections to the Gemini API alive across requests.
+# Closed on application shutdown (see main.py).
+http_client = httpx.AsyncClient(
+    http2=True,
+    timeout=30.0,
+    limits=httpx.Limits(max_keepalive_connections=20),
+)
+
+def _retry_delay(response: httpx.Response | None, attempt: int) -> float:
+    """
+    Seconds to wait before the next attempt: Retry-After when the server sends one,
+    otherwise exponential backoff with +/-25% jitter.
+    """
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), MAX_RETRY_AFTER)
+            except ValueError:
+                pass
+    return GEMINI_BACKOFF_BASE * (2 ** attempt) * random.uniform(0.75, 1.25)
+
+
+async def _post_to_gemini(payload: dict) -> httpx.Response:
+    """
+    POST to Gemini, retrying throttling/server errors and transport failures.
+    Only the request itself holds a concurrency slot; backoff sleeps don't, so a
+    throttled request can't block other chats. Returns the last response once
+    retries are exhausted.
+    """
+    for attempt in range(GEMINI_MAX_ATTEMPTS):
+        last_attempt = attempt == GEMINI_MAX_ATTEMPTS - 1
+        url = GEMINI_URL.format(key=next(_key_cycle))
+        try:
+            async with _gemini_sem:
+                response = await http_client.post(url, json=payload)
+        except httpx.TransportError:
+            if last_attempt:
+                raise
+            await asyncio.sleep(_retry_delay(None, attempt))
+            continue
+        if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+            return response
+        print(f"Gemini API returned {response.status_code}, retrying (attempt {attempt + 1}/{GEMINI_MAX_ATTEMPTS})")
+        await asyncio.sleep(_retry_delay(response, attempt))
+    raise httpx.HTTPError("Gemini request was not attempted")
 
 @router.post("/chat", status_code=status.HTTP_200_OK)
 async def chat_with_gemini(request: ChatRequest):
     """
     Endpoint to handle chat requests and get responses from the Gemini API.
     """
-    if not API_KEY:
+    if not API_KEYS:
         raise HTTPException(status_code=500, detail="GEMINI_API_KEY not set in environment variables.")
 
     # A crucial fix: Filter out the initial model message from the chat history
@@ -40,11 +99,9 @@ async def chat_with_gemini(request: ChatRequest):
         raise HTTPException(status_code=400, detail="No user messages found in the request.")
 
     api_payload = { "contents": cleaned_chat_history }
-    
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key={API_KEY}"
 
     try:
-        response = requests.post(url, json=api_payload)
+        response = await _post_to_gemini(api_payload)
         
         if response.status_code != 200:
             print(f"API Error Response Body: {response.text}")
@@ -70,7 +127,9 @@ async def chat_with_gemini(request: ChatRequest):
         else:
             raise HTTPException(status_code=500, detail="Unexpected response structure from Gemini API.")
     
-    except requests.exceptions.RequestException as e:
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
         print(f"Request to Gemini API failed: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to communicate with Gemini API: {e}")
     except Exception as e:
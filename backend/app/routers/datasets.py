@@ -1,16 +1,25 @@
 # backend/app/routers/datasets.py
 import os
+import asyncio
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional
+from urllib.parse import quote
 
+import aiofiles
+import anyio
 from fastapi import APIRouter, UploadFile, File, Header, Query, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi import status
 
 from app.config import settings
 from app.services import storage
 from app.services.parsing import extract_preview_and_metadata
 from app.services import db
+from app.services import df_cache
+from app.services import profiling
 
 # boto3 only used for generating presigned URL on download when using S3
 try:
@@ -23,6 +32,46 @@ except Exception:
 router = APIRouter()
 logger = logging.getLogger("mlstudio.datasets")
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+# Upload parsing is CPU-bound pandas work; run it in separate processes so it
+# doesn't hold the GIL against other requests. Created on first upload.
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        # Don't fork the (multi-threaded) server itself: forking can copy held locks
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=settings.parse_workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context(method),
+        )
+    return _parse_pool
+
+
+async def _extract_metadata(path: str, preview_rows: int):
+    """
+    Run profiling.extract_profile (metadata + EDA profile) in the parse pool; if the
+    pool has died, drop it (a new one is made next time) and parse in a thread instead.
+    """
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            _get_parse_pool(), profiling.extract_profile, path, preview_rows
+        )
+    except BrokenProcessPool:
+        logger.warning("Parse process pool broke; parsing in a thread")
+        shutdown_parse_pool()
+        return await anyio.to_thread.run_sync(profiling.extract_profile, path, preview_rows)
+
+
+def shutdown_parse_pool() -> None:
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
 # Ensure upload dir exists for local storage
 os.makedirs(settings.upload_dir, exist_ok=True)
 
@@ -44,8 +93,11 @@ async def upload_dataset(
     logger.info(f"User {x_user_uid} started uploading file: {file.filename}")
 
     try:
-        # Corrected call - no upload_dir parameter
-        saved_ref = storage.save_upload_file(file, user_uid=x_user_uid)
+        # Streams the upload to disk/S3 in chunks; rejects oversized files early
+        try:
+            saved_ref = await storage.save_upload_file(file, user_uid=x_user_uid)
+        except storage.FileTooLargeError as e:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
         if not isinstance(saved_ref, str):
             raise RuntimeError("storage.save_upload_file returned unexpected value")
 
@@ -53,7 +105,7 @@ async def upload_dataset(
 
         # Try parsing metadata
         try:
-            metadata = extract_preview_and_metadata(saved_ref, preview_rows=10)
+            metadata = await _extract_metadata(saved_ref, 10)
         except FileNotFoundError:
             logger.exception(f"File not found while parsing: {saved_ref}")
             try:
@@ -81,6 +133,15 @@ async def upload_dataset(
         except Exception:
             size_bytes = None
 
+        # Columnar copy for fast reloads by EDA/training; optional, never fails the upload
+        parquet_path = None
+        try:
+            parquet_path = await anyio.to_thread.run_sync(storage.write_parquet_sidecar, saved_ref)
+        except Exception:
+            logger.warning(f"Could not write Parquet copy for {saved_ref}", exc_info=True)
+
+        # The EDA profile is stored for the EDA endpoints, not echoed back to the client
+        profile = {k: metadata.pop(k, None) for k in ("summary", "missing", "numeric_columns", "profile_version")}
         rows = metadata.get("row_count") or metadata.get("rows") or None
         columns = metadata.get("columns")
         preview = metadata.get("preview")
@@ -94,6 +155,8 @@ async def upload_dataset(
             columns=columns,
             preview=preview,
             uploaded_by_uid=x_user_uid,
+            parquet_path=parquet_path,
+            **profile,
         )
 
         response = {
@@ -117,14 +180,21 @@ async def upload_dataset(
 def list_datasets(uid: Optional[str] = Query(None, description="Filter by uploader uid (optional)")):
     try:
         files = db.list_datasets(uid)
-        return {"datasets": files}
+        # Rows are plain JSON types already: skip jsonable_encoder and serialize directly
+        return ORJSONResponse({"datasets": files})
     except Exception as e:
         logger.exception("Failed to list datasets")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _iter_file(path: str, chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+    async with aiofiles.open(path, "rb") as f:
+        while chunk := await f.read(chunk_size):
+            yield chunk
+
+
 @router.get("/download/{filename}")
-def download_dataset(
+async def download_dataset(
     filename: str,
     x_user_uid: Optional[str] = Header(None, alias="X-User-Uid"),
 ):
@@ -149,12 +219,7 @@ def download_dataset(
             bucket, key = _.split("/", 1)
         except ValueError:
             raise HTTPException(status_code=500, detail="Invalid S3 stored path")
-        s3 = boto3.client(
-            "s3",
-            aws_access_key_id=settings.aws_access_key_id,
-            aws_secret_access_key=settings.aws_secret_access_key,
-            region_name=settings.aws_region,
-        )
+        s3 = storage.get_s3_client()
         try:
             presigned = s3.generate_presigned_url(
                 "get_object",
@@ -169,7 +234,13 @@ def download_dataset(
     local_path = stored_path
     if not os.path.exists(local_path):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(local_path, filename=safe, media_type="application/octet-stream")
+    quoted = quote(safe)
+    disposition = f"attachment; filename*=utf-8''{quoted}" if quoted != safe else f'attachment; filename="{safe}"'
+    headers = {
+        "Content-Disposition": disposition,
+        "Content-Length": str(os.path.getsize(local_path)),
+    }
+    return StreamingResponse(_iter_file(local_path), media_type="application/octet-stream", headers=headers)
 
 
 @router.get("/preview/{filename}")
@@ -225,12 +296,7 @@ def delete_dataset(
                 bucket, key = _.split("/", 1)
             except ValueError:
                 raise HTTPException(status_code=500, detail="Invalid S3 stored path")
-            s3 = boto3.client(
-                "s3",
-                aws_access_key_id=settings.aws_access_key_id,
-                aws_secret_access_key=settings.aws_secret_access_key,
-                region_name=settings.aws_region,
-            )
+            s3 = storage.get_s3_client()
             try:
                 s3.delete_object(Bucket=bucket, Key=key)
                 deleted_from_storage = True
@@ -241,12 +307,17 @@ def delete_dataset(
             if os.path.exists(stored_path):
                 os.remove(stored_path)
                 deleted_from_storage = True
+            sidecar = db_entry.get("parquet_path") or stored_path + storage.PARQUET_SUFFIX
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
     except HTTPException:
         raise
     except Exception as e:
         logger.exception(f"Failed to delete from storage: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    df_cache.invalidate()
+
     try:
         db_deleted = db.delete_dataset_by_filename(safe, uid=x_user_uid)
     except Exception as e:
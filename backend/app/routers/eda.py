@@ -1,17 +1,23 @@
 # backend/app/routers/eda.py
 import os
 import io
-from typing import Any, Dict
+import hashlib
+from typing import Any, Dict, List, Optional
 
 from urllib.parse import unquote
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
+import anyio
+import numpy as np
 import pandas as pd
 
 from app.config import settings
 from app.services import storage
 from app.services import db
+from app.services import parsing
+from app.services import df_cache
+from app.services import profiling
 
 # ---------- Safe, headless plotting imports ----------
 try:
@@ -26,6 +32,17 @@ except Exception as e:
 
 router = APIRouter()
 
+# Parsing and pandas work is CPU-bound: give it its own, smaller thread budget so it
+# can't occupy all of anyio's default 40 threads that the other endpoints share.
+_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def _eda_limiter() -> anyio.CapacityLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(settings.eda_max_threads or os.cpu_count() or 4)
+    return _limiter
+
 
 def _safe_path(filename: str) -> str:
     """
@@ -86,132 +103,274 @@ def _safe_path(filename: str) -> str:
 
 def _load_dataframe_from_path_or_uri(path_or_uri: str) -> pd.DataFrame:
     """
-    If path_or_uri is an s3:// URI, use storage.load_dataset to get DataFrame.
-    Otherwise, read from the local path with pandas.
+    Load the full DataFrame for a local path or s3:// URI.
+    Parses are cached per process while the file is unchanged, so clicking through
+    preview -> summary -> missing -> correlation reads the file once.
+    The result is shared: never mutate it in place.
+    """
+    return df_cache.load_dataframe(path_or_uri)
+
+
+def _stored_profile(path_or_uri: str) -> Optional[Dict[str, Any]]:
+    """
+    Profile saved for this dataset (at upload or by _refresh_profile), or None
+    if there is none or the file has changed since it was computed.
+    """
+    try:
+        profile = db.get_dataset_profile(path_or_uri)
+        if not profile or profile.get("profile_version") != profiling.profile_version(path_or_uri):
+            return None
+    except Exception:
+        return None
+    return profile
+
+
+def _profile_section(path_or_uri: str, key: str) -> Dict[str, Any]:
+    """
+    One section ("summary" / "missing") of the dataset profile. Served from the DB
+    when current; otherwise recomputed from the file and saved for next time.
+    """
+    profile = _stored_profile(path_or_uri)
+    if profile and profile.get(key) is not None:
+        return profile[key]
+    version = profiling.profile_version(path_or_uri)
+    df = _load_dataframe_from_path_or_uri(path_or_uri)
+    profile = profiling.build_profile(df, version)
+    try:
+        db.save_dataset_profile(path_or_uri, **profile)
+    except Exception:
+        pass
+    return profile[key]
+
+
+def _load_numeric_dataframe(path_or_uri: str) -> pd.DataFrame:
+    """
+    Like _load_dataframe_from_path_or_uri, but reads only the numeric columns
+    when they can be determined up front, so wide text columns are never parsed.
+    """
+    profile = _stored_profile(path_or_uri)
+    cols = profile.get("numeric_columns") if profile else None
+    if cols is None:
+        cols = storage.numeric_columns(path_or_uri)
+    if cols is None:
+        return df_cache.load_dataframe(path_or_uri)
+    if not cols:
+        return pd.DataFrame()
+    return df_cache.load_dataframe(path_or_uri, columns=tuple(cols))
+
+
+def _read_preview(path: str, rows: int) -> List[Dict[str, Any]]:
+    # S3 objects go through storage.load_dataset; local files are read block-wise
+    if isinstance(path, str) and path.startswith("s3://"):
+        df = storage.load_dataset(path, nrows=rows)
+        return df.fillna("").to_dict(orient="records")
+    return parsing.read_preview(path, rows)
+
+
+def _correlation(df: pd.DataFrame) -> Dict[str, Any]:
+    num_df = df.select_dtypes(include=["number"])
+    if num_df.shape[1] == 0:
+        return {"message": "No numeric columns to compute correlation.", "correlation": {}}
+
+    cols = list(num_df.columns)
+    corr = np.round(_pearson_matrix(num_df.to_numpy(dtype=np.float64)), 4)
+    return {"correlation": {c: dict(zip(cols, col.tolist())) for c, col in zip(cols, corr.T)}}
+
+
+def _pearson_matrix(arr: np.ndarray) -> np.ndarray:
+    """
+    Pearson correlation of the columns of arr, with the same pairwise-complete
+    handling of NaN as DataFrame.corr(), computed with a few matrix products
+    instead of a per-pair loop. Undefined entries (constant columns, < 2 shared
+    rows) are returned as 0.
+    """
+    mask = ~np.isnan(arr)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if mask.all():
+            corr = np.atleast_2d(np.corrcoef(arr, rowvar=False))
+        else:
+            # Centre on the column means first to keep the sums well conditioned
+            x = np.where(mask, arr - np.nanmean(arr, axis=0), 0.0)
+            m = mask.astype(np.float64)
+            n = m.T @ m                 # rows where both columns are present
+            sx = x.T @ m                # sum of column i over those rows
+            sxx = (x * x).T @ m         # sum of squares of column i over those rows
+            sxy = x.T @ x
+            cov = sxy - sx * sx.T / n
+            var_i = sxx - sx * sx / n
+            corr = cov / np.sqrt(var_i * var_i.T)
+            corr[n < 2] = np.nan
+    return np.clip(np.nan_to_num(corr, nan=0.0), -1.0, 1.0)
+
+
+def _value_counts(series: pd.Series, top: int) -> Dict[str, Any]:
+    vc = series.fillna("<<MISSING>>").astype(str).value_counts().head(top)
+    return {"value_counts": [{"value": str(idx), "count": int(cnt)} for idx, cnt in vc.items()]}
+
+
+def _column_value_counts(path: str, column: str, top: int) -> Optional[Dict[str, Any]]:
+    """
+    Value counts computed by pyarrow on just the requested column.
+    Only the distinct values are converted to pandas for labelling, so labels
+    match _value_counts. Returns None if the column isn't readable via arrow.
+    """
+    values = storage.read_column(path, column)
+    if values is None:
+        return None
+    vc = values.value_counts()
+    distinct = vc.field("values").to_pandas()
+    labels = distinct.astype(str).where(distinct.notna(), "<<MISSING>>")
+    counts = pd.Series(vc.field("counts").to_numpy(), index=labels.to_numpy())
+    # Distinct raw values can share a label (e.g. null and a literal "<<MISSING>>")
+    counts = counts.groupby(level=0, sort=False).sum()
+    counts = counts.sort_values(ascending=False, kind="stable").head(top)
+    return {"value_counts": [{"value": str(idx), "count": int(cnt)} for idx, cnt in counts.items()]}
+
+
+def _histogram_data(series: pd.Series, column: str, bins: int) -> Dict[str, Any]:
+    data = series.dropna()
+    if pd.api.types.is_numeric_dtype(series):
+        values = data.to_numpy(dtype=np.float64, copy=False)
+        counts, edges = np.histogram(values[np.isfinite(values)], bins=bins)
+        return {"column": column, "kind": "numeric", "bins": edges.tolist(), "counts": counts.tolist()}
+    vc = data.astype(str).value_counts().head(30)
+    return {"column": column, "kind": "categorical", "labels": vc.index.tolist(), "counts": [int(c) for c in vc.values]}
+
+
+def _render_histogram(series: pd.Series, column: str, bins: int) -> io.BytesIO:
+    data = series.dropna()
+    fig, ax = plt.subplots(figsize=(6, 4))
+    try:
+        if pd.api.types.is_numeric_dtype(series):
+            ax.hist(data.astype(float), bins=bins)
+            ax.set_xlabel(column)
+            ax.set_ylabel("Count")
+            ax.set_title(f"Histogram: {column}")
+        else:
+            vc = data.astype(str).value_counts().head(30)
+            sns.barplot(x=vc.values, y=vc.index, ax=ax)
+            ax.set_xlabel("Count")
+            ax.set_ylabel(column)
+            ax.set_title(f"Top values: {column}")
+        plt.tight_layout()
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png")
+    finally:
+        plt.close(fig)
+    buf.seek(0)
+    return buf
+
+
+EDA_CACHE_CONTROL = "private, max-age=300"
+
+
+def _etag(path: str, *parts: Any) -> Optional[str]:
+    """
+    ETag for an EDA response: changes whenever the dataset file changes
+    (mtime/size, or S3 ETag) or the endpoint/parameters differ.
+    None if the dataset can't be stat'ed (the handler then reports the error).
     """
-    if isinstance(path_or_uri, str) and path_or_uri.startswith("s3://"):
-        # storage.load_dataset should return a DataFrame when given s3://
-        return storage.load_dataset(path_or_uri)
-    # else local path
-    ext = os.path.splitext(path_or_uri)[1].lower()
-    if ext == ".csv":
-        return pd.read_csv(path_or_uri)
-    else:
-        return pd.read_excel(path_or_uri, engine="openpyxl")
+    try:
+        version = df_cache.dataset_version(path)
+    except Exception:
+        return None
+    key = repr((path, version) + parts).encode()
+    return '"%s"' % hashlib.blake2b(key, digest_size=16).hexdigest()
+
+
+def _etag_matches(request: Request, tag: Optional[str]) -> bool:
+    header = request.headers.get("if-none-match")
+    if not tag or not header:
+        return False
+    candidates = [t.strip() for t in header.split(",")]
+    return "*" in candidates or any(t.removeprefix("W/") == tag for t in candidates)
+
+
+def _cache_headers(tag: Optional[str]) -> Dict[str, str]:
+    if not tag:
+        return {}
+    return {"ETag": tag, "Cache-Control": EDA_CACHE_CONTROL}
 
 
 @router.get("/{filename}/preview")
-def preview_dataset(filename: str, rows: int = 10):
+async def preview_dataset(request: Request, response: Response, filename: str, rows: int = 10):
     path = _safe_path(filename)
+    tag = await anyio.to_thread.run_sync(_etag, path, "preview", rows)
+    if _etag_matches(request, tag):
+        return Response(status_code=304, headers=_cache_headers(tag))
     try:
-        # prefer using storage.load_dataset for S3/complex cases; otherwise read directly
-        if isinstance(path, str) and path.startswith("s3://"):
-            df = storage.load_dataset(path, nrows=rows)
-        else:
-            ext = os.path.splitext(path)[1].lower()
-            if ext == ".csv":
-                df = pd.read_csv(path, nrows=rows)
-            else:
-                df = pd.read_excel(path, engine="openpyxl", nrows=rows)
+        preview = await anyio.to_thread.run_sync(_read_preview, path, rows, limiter=_eda_limiter())
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Dataset not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read file: {str(e)}")
-    return JSONResponse(content={"preview": df.fillna("").to_dict(orient="records")})
+    response.headers.update(_cache_headers(tag))
+    return {"preview": preview}
 
 
 @router.get("/{filename}/summary")
-def summary_dataset(filename: str):
+async def summary_dataset(request: Request, response: Response, filename: str):
     path = _safe_path(filename)
+    tag = await anyio.to_thread.run_sync(_etag, path, "summary")
+    if _etag_matches(request, tag):
+        return Response(status_code=304, headers=_cache_headers(tag))
     try:
-        df = _load_dataframe_from_path_or_uri(path)
+        summary = await anyio.to_thread.run_sync(_profile_section, path, "summary", limiter=_eda_limiter())
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Dataset not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read file: {str(e)}")
 
-    summary: Dict[str, Any] = {}
-    for col in df.columns:
-        col_data = df[col]
-        info: Dict[str, Any] = {
-            "dtype": str(col_data.dtype),
-            "count": int(col_data.count()),
-            "n_missing": int(col_data.isna().sum()),
-        }
-
-        if pd.api.types.is_numeric_dtype(col_data):
-            try:
-                desc = col_data.describe().to_dict()
-                numeric_stats = {k: (None if pd.isna(v) else (float(v) if not isinstance(v, (int, float)) else v)) for k, v in desc.items()}
-                info["numeric"] = numeric_stats
-                try:
-                    info["skew"] = float(col_data.skew())
-                    info["kurtosis"] = float(col_data.kurtosis())
-                except Exception:
-                    info["skew"] = None
-                    info["kurtosis"] = None
-            except Exception:
-                info["numeric"] = {}
-        else:
-            try:
-                vc = col_data.dropna().astype(str).value_counts()
-                top = vc.index[0] if len(vc) > 0 else None
-                top_freq = int(vc.iloc[0]) if len(vc) > 0 else None
-                unique = int(col_data.nunique(dropna=True))
-                info.update({"unique": unique, "top": top, "top_freq": top_freq})
-            except Exception:
-                info.update({"unique": int(col_data.nunique(dropna=True)), "top": None, "top_freq": None})
-
-        summary[col] = info
-
-    return JSONResponse(content={"columns": list(summary.keys()), "summary": summary})
+    response.headers.update(_cache_headers(tag))
+    return summary
 
 
 @router.get("/{filename}/missing")
-def missing_report(filename: str):
+async def missing_report(request: Request, response: Response, filename: str):
     path = _safe_path(filename)
+    tag = await anyio.to_thread.run_sync(_etag, path, "missing")
+    if _etag_matches(request, tag):
+        return Response(status_code=304, headers=_cache_headers(tag))
     try:
-        df = _load_dataframe_from_path_or_uri(path)
+        missing = await anyio.to_thread.run_sync(_profile_section, path, "missing", limiter=_eda_limiter())
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Dataset not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read file: {str(e)}")
 
-    total = len(df)
-    missing = []
-    for col in df.columns:
-        nmiss = int(df[col].isna().sum())
-        pct = (nmiss / total * 100.0) if total > 0 else 0.0
-        missing.append({"column": col, "missing_count": nmiss, "missing_pct": round(pct, 4)})
-    missing_sorted = sorted(missing, key=lambda x: x["missing_count"], reverse=True)
-    high_missing = [m for m in missing_sorted if m["missing_pct"] >= 30.0]
-    return JSONResponse(content={"total_rows": total, "missing": missing_sorted, "high_missing": high_missing})
+    response.headers.update(_cache_headers(tag))
+    return missing
 
 
 @router.get("/{filename}/correlation")
-def correlation_matrix(filename: str):
+async def correlation_matrix(request: Request, response: Response, filename: str):
     path = _safe_path(filename)
+    tag = await anyio.to_thread.run_sync(_etag, path, "correlation")
+    if _etag_matches(request, tag):
+        return Response(status_code=304, headers=_cache_headers(tag))
     try:
-        df = _load_dataframe_from_path_or_uri(path)
+        df = await anyio.to_thread.run_sync(_load_numeric_dataframe, path, limiter=_eda_limiter())
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Dataset not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read file: {str(e)}")
 
-    num_df = df.select_dtypes(include=["number"])
-    if num_df.shape[1] == 0:
-        return JSONResponse(content={"message": "No numeric columns to compute correlation.", "correlation": {}})
-
-    corr = num_df.corr().fillna(0).round(4)
-    corr_dict = corr.to_dict()
-    return JSONResponse(content={"correlation": corr_dict})
+    response.headers.update(_cache_headers(tag))
+    return await anyio.to_thread.run_sync(_correlation, df, limiter=_eda_limiter())
 
 
 @router.get("/{filename}/valuecounts/{column}")
-def value_counts(filename: str, column: str, top: int = Query(20, ge=1, le=100)):
+async def value_counts(request: Request, response: Response, filename: str, column: str, top: int = Query(20, ge=1, le=100)):
     path = _safe_path(filename)
+    tag = await anyio.to_thread.run_sync(_etag, path, "valuecounts", column, top)
+    if _etag_matches(request, tag):
+        return Response(status_code=304, headers=_cache_headers(tag))
     try:
-        df = _load_dataframe_from_path_or_uri(path)
+        result = await anyio.to_thread.run_sync(_column_value_counts, path, column, top, limiter=_eda_limiter())
+        if result is not None:
+            response.headers.update(_cache_headers(tag))
+            return result
+        df = await anyio.to_thread.run_sync(_load_dataframe_from_path_or_uri, path, limiter=_eda_limiter())
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Dataset not found")
     except Exception as e:
@@ -219,19 +378,32 @@ def value_counts(filename: str, column: str, top: int = Query(20, ge=1, le=100))
 
     if column not in df.columns:
         raise HTTPException(status_code=404, detail="Column not found")
-    vc = df[column].fillna("<<MISSING>>").astype(str).value_counts().head(top)
-    result = [{"value": str(idx), "count": int(cnt)} for idx, cnt in vc.items()]
-    return JSONResponse(content={"value_counts": result})
+    response.headers.update(_cache_headers(tag))
+    return await anyio.to_thread.run_sync(_value_counts, df[column], top, limiter=_eda_limiter())
 
 
 @router.get("/{filename}/histogram/{column}")
-def histogram_image(filename: str, column: str, bins: int = Query(30, ge=1, le=200)):
-    if not HAS_PLOTTING:
+async def histogram_image(
+    request: Request,
+    response: Response,
+    filename: str,
+    column: str,
+    bins: int = Query(30, ge=1, le=200),
+    fmt: str = Query("json", alias="format", pattern="^(json|png)$"),
+):
+    """
+    Histogram bins (numeric) or top-30 value counts (categorical) as JSON.
+    ?format=png returns the legacy server-rendered image instead.
+    """
+    if fmt == "png" and not HAS_PLOTTING:
         raise HTTPException(status_code=501, detail="Plotting libraries (matplotlib/seaborn) not installed on server.")
 
     path = _safe_path(filename)
+    tag = await anyio.to_thread.run_sync(_etag, path, "histogram", column, bins, fmt)
+    if _etag_matches(request, tag):
+        return Response(status_code=304, headers=_cache_headers(tag))
     try:
-        df = _load_dataframe_from_path_or_uri(path)
+        df = await anyio.to_thread.run_sync(_load_dataframe_from_path_or_uri, path, limiter=_eda_limiter())
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Dataset not found")
     except Exception as e:
@@ -240,28 +412,16 @@ def histogram_image(filename: str, column: str, bins: int = Query(30, ge=1, le=2
     if column not in df.columns:
         raise HTTPException(status_code=404, detail="Column not found")
 
-    data = df[column].dropna()
-    fig, ax = plt.subplots(figsize=(6, 4))
+    if fmt == "json":
+        try:
+            data = await anyio.to_thread.run_sync(_histogram_data, df[column], column, bins, limiter=_eda_limiter())
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to compute histogram: {str(e)}")
+        response.headers.update(_cache_headers(tag))
+        return data
+
     try:
-        if pd.api.types.is_numeric_dtype(df[column]):
-            ax.hist(data.astype(float), bins=bins)
-            ax.set_xlabel(column)
-            ax.set_ylabel("Count")
-            ax.set_title(f"Histogram: {column}")
-        else:
-            vc = data.astype(str).value_counts().head(30)
-            sns.barplot(x=vc.values, y=vc.index, ax=ax)
-            ax.set_xlabel("Count")
-            ax.set_ylabel(column)
-            ax.set_title(f"Top values: {column}")
-        plt.tight_layout()
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png")
+        buf = await anyio.to_thread.run_sync(_render_histogram, df[column], column, bins, limiter=_eda_limiter())
     except Exception as e:
-        plt.close(fig)
         raise HTTPException(status_code=500, detail=f"Failed to generate plot: {str(e)}")
-    finally:
-        plt.close(fig)
-
-    buf.seek(0)
-    return StreamingResponse(buf, media_type="image/png")
+    return StreamingResponse(buf, media_type="image/png", headers=_cache_headers(tag))
@@ -1,7 +1,13 @@
 import os
+import asyncio
+import contextlib
 import traceback
 import logging
-from fastapi import APIRouter, HTTPException, Depends, Header, UploadFile, File, Form, status
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from uuid import uuid4
+from fastapi import APIRouter, HTTPException, Depends, Header, UploadFile, File, Form, Request, Response, status
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 
@@ -11,6 +17,64 @@ from app.config import settings
 router = APIRouter()
 logger = logging.getLogger("mlstudio.model_builder")
 
+BULK_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8 MiB per read: few syscalls, bounded memory
+
+# Training and prediction are CPU-bound sklearn calls; they run on bounded pools so the
+# event loop stays free. Threads rather than processes: the session a worker writes holds
+# lazy plot callables (partials over the fitted data) and a local model path, and the
+# registry's no-diskcache fallback is a per-process dict.
+_train_pool = ThreadPoolExecutor(
+    max_workers=settings.train_workers or os.cpu_count(), thread_name_prefix="mlstudio-train"
+)
+_predict_pool = ThreadPoolExecutor(
+    max_workers=settings.predict_workers or os.cpu_count(), thread_name_prefix="mlstudio-predict"
+)
+
+
+async def _run_in_pool(pool: ThreadPoolExecutor, func, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(pool, partial(func, **kwargs))
+
+
+def shutdown_pools() -> None:
+    _train_pool.shutdown(wait=False, cancel_futures=True)
+    _predict_pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Strong references to fire-and-forget tasks so they are not garbage-collected mid-run
+_background_tasks = set()
+
+
+def _spawn_background(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _remove_quietly(path: str) -> None:
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def _plot_urls(request: Request, session_id: str, plots: Optional[Dict]) -> Dict[str, str]:
+    return {
+        name: request.app.url_path_for("get_session_plot", session_id=session_id, name=name)
+        for name, png in (plots or {}).items()
+        if png is not None
+    }
+
+
+def _with_plot_urls(request: Request, result: Dict) -> Dict:
+    # Plots are served as PNGs by get_session_plot rather than inlined in the JSON
+    return {**result, "plots": _plot_urls(request, result["session_id"], result.get("plots"))}
+
+
+def _error_detail(e: Exception) -> Dict[str, str]:
+    # Tracebacks are only echoed to the client in debug mode; they are always logged
+    detail = {"error": str(e)}
+    if settings.debug:
+        detail["traceback"] = "".join(traceback.format_exception(e))
+    return detail
+
 
 # Helper to get user ID from header with fallback
 def get_user_id(x_user_uid: Optional[str] = Header(None, alias="X-User-Uid")) -> str:
@@ -44,6 +108,12 @@ def _resolve_dataset_path(dataset_identifier: str, user_id: str) -> str:
         raise ValueError("Empty dataset identifier")
 
     safe = os.path.basename(dataset_identifier)
+
+    # Local uploads live at a predictable path: a stat() is cheaper than a DB lookup
+    candidate_path = os.path.join(settings.upload_dir, user_id, safe)
+    if os.path.exists(candidate_path):
+        return candidate_path
+
     try:
         entry = db.get_dataset_by_filename(safe, uid=user_id)
     except Exception as e:
@@ -53,23 +123,21 @@ def _resolve_dataset_path(dataset_identifier: str, user_id: str) -> str:
     if entry and entry.get("path"):
         return entry["path"]
 
-    candidate_path = os.path.join(settings.upload_dir, user_id, safe)
-    if os.path.exists(candidate_path):
-        return candidate_path
-
     raise FileNotFoundError(f"Dataset '{dataset_identifier}' not found for user '{user_id}'")
 
 
 # TRAIN endpoint
 @router.post("/train")
-def train(req: TrainRequest, user_id: str = Depends(get_user_id)):
+async def train(req: TrainRequest, request: Request, user_id: str = Depends(get_user_id)):
     try:
         resolved_path = _resolve_dataset_path(req.dataset, user_id)
         logger.info(
             f"Training request: task={req.task}, algo={req.algorithm}, dataset={req.dataset}, resolved={resolved_path}, "
             f"test_size={req.test_size}, improve_with={req.improve_with}, user={user_id}"
         )
-        result = model_trainer.train_model(
+        result = await _run_in_pool(
+            _train_pool,
+            model_trainer.train_model,
             task=req.task,
             algorithm=req.algorithm,
             dataset_filename=resolved_path,
@@ -77,16 +145,15 @@ def train(req: TrainRequest, user_id: str = Depends(get_user_id)):
             improve_with=req.improve_with,
             user_uid=user_id,
         )
-        return result
+        return _with_plot_urls(request, result)
     except Exception as e:
-        tb = traceback.format_exc()
-        logger.error(f"Training error: {e}\n{tb}")
-        raise HTTPException(status_code=500, detail={"error": str(e), "traceback": tb})
+        logger.exception("Training error")
+        raise HTTPException(status_code=500, detail=_error_detail(e))
 
 
 # IMPROVE endpoint
 @router.post("/improve")
-def improve(req: ImproveRequest):
+async def improve(req: ImproveRequest, request: Request):
     sess = registry.get_session(req.session_id)
     if not sess:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -101,7 +168,9 @@ def improve(req: ImproveRequest):
             f"Improve request: session={req.session_id}, dataset={dataset_identifier}, resolved={resolved_path}, new_improve={req.improve_with}"
         )
 
-        result = model_trainer.train_model(
+        result = await _run_in_pool(
+            _train_pool,
+            model_trainer.train_model,
             task=meta["task"],
             algorithm=meta["algorithm"],
             dataset_filename=resolved_path,
@@ -109,11 +178,10 @@ def improve(req: ImproveRequest):
             improve_with=req.improve_with,
             user_uid=created_by,
         )
-        return result
+        return _with_plot_urls(request, result)
     except Exception as e:
-        tb = traceback.format_exc()
-        logger.error(f"Improve training error: {e}\n{tb}")
-        raise HTTPException(status_code=500, detail={"error": str(e), "traceback": tb})
+        logger.exception("Improve training error")
+        raise HTTPException(status_code=500, detail=_error_detail(e))
 
 
 # SAVE model endpoint
@@ -153,18 +221,39 @@ def save_model(req: SaveRequest, user_id: str = Depends(get_user_id)):
         logger.info(f"Model saved successfully at {saved_location} for user {user_id}")
         return {"status": "ok", "saved_location": saved_location}
     except Exception as e:
-        tb = traceback.format_exc()
-        logger.exception(f"Failed to save model: {e}")
-        raise HTTPException(status_code=500, detail={"error": str(e), "traceback": tb})
+        logger.exception("Failed to save model")
+        raise HTTPException(status_code=500, detail=_error_detail(e))
 
 
 # SESSION info endpoint
 @router.get("/session/{session_id}")
-def get_session(session_id: str):
+def get_session(session_id: str, request: Request):
     sess = registry.get_session(session_id)
     if not sess:
         raise HTTPException(status_code=404, detail="Session not found")
-    return sess["metadata"]
+    meta = dict(sess["metadata"])
+    meta["plots"] = _plot_urls(request, session_id, meta.get("plots"))
+    return meta
+
+
+# Session plot images (kept in the registry, see _with_plot_urls)
+@router.get("/session/{session_id}/plot/{name}")
+def get_session_plot(session_id: str, name: str):
+    sess = registry.get_session(session_id)
+    plots = (sess["metadata"].get("plots") or {}) if sess else {}
+    png = plots.get(name)
+    if png is None:
+        raise HTTPException(status_code=404, detail="Plot not found")
+    if callable(png):
+        # Rendered on first fetch (see evaluation.py), then kept with the session
+        try:
+            png = png()
+            registry.set_session_plot(session_id, name, png)
+        except Exception as e:
+            logger.exception(f"Rendering plot {name!r} for session {session_id} failed")
+            raise HTTPException(status_code=500, detail=f"Plot rendering failed: {e}")
+    # A session's plots never change, so browsers may keep them
+    return Response(content=png, media_type="image/png", headers={"Cache-Control": "private, max-age=3600"})
 
 
 # List saved models for user
@@ -173,20 +262,18 @@ def list_saved_models(x_user_uid: Optional[str] = Header(None, alias="X-User-Uid
     if not x_user_uid:
         raise HTTPException(status_code=400, detail="X-User-Uid header is required")
     user_id = x_user_uid.strip()
-    models = db.list_saved_models_for_user(uid=user_id)
-    return {"models": models}
+    models = db.list_saved_models_for_user_lite(uid=user_id)
+    # Rows are plain JSON types already: skip jsonable_encoder and serialize directly
+    return ORJSONResponse({"models": models})
 
 
 # Get model features
 @router.get("/features/{model_id}")
 def get_model_features(model_id: int, user_id: str = Depends(get_user_id)):
-    model = db.get_saved_model_by_id(model_id, uid=user_id)
-    if not model:
+    features = db.get_model_features(model_id, uid=user_id)
+    if features is None:
         raise HTTPException(status_code=404, detail="Model not found")
-
-    metrics = model.get("metrics", {})
-    features = metrics.get("features", [])
-    return {"features": features}
+    return ORJSONResponse({"features": features})
 
 
 # BULK prediction endpoint
@@ -201,13 +288,23 @@ async def predict_bulk(
         raise HTTPException(status_code=404, detail="Model not found")
 
     temp_dir = os.path.join(settings.temp_dir, user_id)
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_filepath = os.path.join(temp_dir, file.filename)
-    with open(temp_filepath, "wb") as f:
-        f.write(await file.read())
+    await asyncio.to_thread(os.makedirs, temp_dir, exist_ok=True)
+    # Unique name so concurrent uploads of the same file don't clobber each other
+    temp_filepath = os.path.join(temp_dir, f"{uuid4().hex}_{os.path.basename(file.filename or 'input.csv')}")
+    try:
+        await storage.write_upload_to_path(
+            file,
+            temp_filepath,
+            chunk_size=BULK_UPLOAD_CHUNK_SIZE,
+            max_bytes=settings.max_file_size or None,
+        )
+    except storage.FileTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
 
     try:
-        predictions = model_trainer.predict_bulk(
+        predictions = await _run_in_pool(
+            _predict_pool,
+            model_trainer.predict_bulk,
             model_filepath=model["saved_location"],
             input_filepath=temp_filepath,
         )
@@ -216,8 +313,8 @@ async def predict_bulk(
         logger.error(f"Bulk prediction error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
     finally:
-        if os.path.exists(temp_filepath):
-            os.remove(temp_filepath)
+        # Best effort and off the response path; the periodic temp sweep catches leftovers
+        _spawn_background(asyncio.to_thread(_remove_quietly, temp_filepath))
 
 
 # Manual prediction endpoint
@@ -227,13 +324,15 @@ class ManualPredictRequest(BaseModel):
 
 
 @router.post("/predict/manual")
-def predict_manual(req: ManualPredictRequest, user_id: str = Depends(get_user_id)):
+async def predict_manual(req: ManualPredictRequest, user_id: str = Depends(get_user_id)):
     model = db.get_saved_model_by_id(req.model_id, uid=user_id)
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
 
     try:
-        prediction = model_trainer.predict_manual(
+        prediction = await _run_in_pool(
+            _predict_pool,
+            model_trainer.predict_manual,
             model_filepath=model["saved_location"],
             inputs=req.inputs,
         )
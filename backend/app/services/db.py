@@ -1,9 +1,34 @@
 import os
 import sqlite3
 import json
+import functools
+import threading
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
+from cachetools import TTLCache
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+if orjson is not None:
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=_ORJSON_OPTS).decode("utf-8")
+
+    def _loads(data: str) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Rows written by the stdlib encoder may contain NaN/Infinity literals
+            return json.loads(data)
+else:
+    _dumps = json.dumps
+    _loads = json.loads
+
 # Database file path
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "metadata.db")
@@ -21,10 +46,21 @@ CREATE TABLE IF NOT EXISTS datasets (
   columns TEXT, -- stored as JSON list
   preview TEXT, -- stored as JSON stringified rows
   uploaded_by_uid TEXT,
-  uploaded_at TEXT
+  uploaded_at TEXT,
+  parquet_path TEXT, -- columnar copy of the dataset, if one was written
+  summary TEXT, -- precomputed EDA summary (JSON)
+  missing TEXT, -- precomputed missing-value report (JSON)
+  numeric_columns TEXT, -- JSON list
+  profile_version TEXT -- file version the three profile columns were computed from
 );
 """
 
+# Columns returned for dataset listings/lookups (the profile blobs are fetched separately)
+DATASET_COLUMNS = "id, filename, path, size_bytes, rows, columns, preview, uploaded_by_uid, uploaded_at, parquet_path"
+
+# Columns returned for the saved-models listing
+MODEL_LIST_COLUMNS = "id, name, task, algorithm, dataset_name, uploaded_by_uid, created_at"
+
 # Models table schema (with uploaded_by_uid for user ownership)
 CREATE_MODELS_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS models (
@@ -41,23 +77,103 @@ CREATE TABLE IF NOT EXISTS models (
 );
 """
 
+_INSERT_DATASET_SQL = (
+    "INSERT INTO datasets (filename, path, size_bytes, rows, columns, preview, uploaded_by_uid, uploaded_at, parquet_path,"
+    " summary, missing, numeric_columns, profile_version) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)"
+)
+
+_INSERT_MODEL_SQL = (
+    "INSERT INTO models (name, session_id, task, algorithm, dataset_name, metrics, saved_location, uploaded_by_uid, created_at)"
+    " VALUES (?,?,?,?,?,?,?,?,?)"
+)
+
 def _get_conn():
     os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB of the DB file mapped for reads
     return conn
 
-# Persistent connection to DB
+def _ensure_column(conn, table: str, column: str, decl: str) -> None:
+    """Add a column to an existing table created by an older schema version."""
+    existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+# Single persistent writer connection: every INSERT/UPDATE/DELETE (and its commit) runs
+# on it under _write_lock, so writes are serialized in one place.
 _conn = _get_conn()
+_write_lock = threading.Lock()
+
+# WAL lets readers proceed while a write is in progress (and other worker processes
+# read concurrently); NORMAL sync is durable across app crashes in WAL mode.
+_conn.execute("PRAGMA journal_mode=WAL")
 
 # Create tables at module load if they do not exist
 _conn.execute(CREATE_TABLE_SQL)
 _conn.execute(CREATE_MODELS_TABLE_SQL)
+_ensure_column(_conn, "datasets", "parquet_path", "TEXT")
+for _col in ("summary", "missing", "numeric_columns", "profile_version"):
+    _ensure_column(_conn, "datasets", _col, "TEXT")
+_conn.execute("CREATE INDEX IF NOT EXISTS idx_datasets_filename_uid ON datasets(filename, uploaded_by_uid)")
+_conn.execute("CREATE INDEX IF NOT EXISTS idx_datasets_uid_id ON datasets(uploaded_by_uid, id DESC)")
+_conn.execute("CREATE INDEX IF NOT EXISTS idx_datasets_path ON datasets(path)")
+_conn.execute("CREATE INDEX IF NOT EXISTS idx_models_uid_id ON models(uploaded_by_uid, id DESC)")
+_conn.execute("CREATE INDEX IF NOT EXISTS idx_models_name_uid ON models(name, uploaded_by_uid)")
+# uids are stored trimmed so lookups can use the indexes; normalize rows written before that
+for _table in ("datasets", "models"):
+    _conn.execute(f"UPDATE {_table} SET uploaded_by_uid = TRIM(uploaded_by_uid) WHERE uploaded_by_uid != TRIM(uploaded_by_uid)")
 _conn.commit()
 
+# Readers get one connection per thread, so lookups never wait on each other or on
+# the writer lock (WAL readers see the last committed state).
+_local = threading.local()
+
+def _read_conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _get_conn()
+        _local.conn = conn
+    return conn
+
+def _clean_uid(uid: Optional[str]) -> Optional[str]:
+    return uid.strip() if isinstance(uid, str) else uid
+
+# --- Read cache --- #
+# Hot read-only lookups are memoized for a short TTL and the whole cache is dropped
+# on every write from this process. Other worker processes see writes after <= TTL.
+# Cached results are shared between callers: treat them as read-only.
+READ_CACHE_TTL = 30  # seconds
+_read_cache = TTLCache(maxsize=512, ttl=READ_CACHE_TTL)
+_read_cache_lock = threading.Lock()
+_read_cache_generation = 0  # bumped on invalidation so a read racing a write isn't stored
+
+def _cached_read(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        with _read_cache_lock:
+            if key in _read_cache:
+                return _read_cache[key]
+            generation = _read_cache_generation
+        result = func(*args, **kwargs)
+        with _read_cache_lock:
+            if generation == _read_cache_generation:
+                _read_cache[key] = result
+        return result
+    return wrapper
+
+def invalidate_read_cache() -> None:
+    global _read_cache_generation
+    with _read_cache_lock:
+        _read_cache_generation += 1
+        _read_cache.clear()
+
 # --- Dataset metadata management --- #
 
-def save_dataset_metadata(
+def _dataset_row(
     filename: str,
     path: str,
     size_bytes: int,
@@ -65,84 +181,143 @@ def save_dataset_metadata(
     columns: Optional[List[str]],
     preview: Optional[List[Dict[str, Any]]],
     uploaded_by_uid: Optional[str] = None,
-) -> int:
-    conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO datasets (filename, path, size_bytes, rows, columns, preview, uploaded_by_uid, uploaded_at) VALUES (?,?,?,?,?,?,?,?)",
-        (
-            filename,
-            path,
-            size_bytes,
-            rows if rows is not None else None,
-            json.dumps(columns or []),
-            json.dumps(preview or []),
-            uploaded_by_uid,
-            datetime.utcnow().isoformat(),
-        ),
+    parquet_path: Optional[str] = None,
+    summary: Optional[Dict[str, Any]] = None,
+    missing: Optional[Dict[str, Any]] = None,
+    numeric_columns: Optional[List[str]] = None,
+    profile_version: Optional[str] = None,
+) -> tuple:
+    return (
+        filename,
+        path,
+        size_bytes,
+        rows if rows is not None else None,
+        _dumps(columns or []),
+        _dumps(preview or []),
+        _clean_uid(uploaded_by_uid),
+        datetime.utcnow().isoformat(),
+        parquet_path,
+        _dumps(summary) if summary is not None else None,
+        _dumps(missing) if missing is not None else None,
+        _dumps(numeric_columns) if numeric_columns is not None else None,
+        profile_version,
     )
-    conn.commit()
-    return cur.lastrowid
+
+def save_dataset_metadata(*args, **kwargs) -> int:
+    """
+    Insert one dataset record (arguments as for `_dataset_row`) and return its id.
+    """
+    row = _dataset_row(*args, **kwargs)
+    with _write_lock:
+        cur = _conn.cursor()
+        cur.execute(_INSERT_DATASET_SQL, row)
+        _conn.commit()
+        new_id = cur.lastrowid
+    invalidate_read_cache()
+    return new_id
+
+def save_datasets_metadata_bulk(items: List[Dict[str, Any]]) -> int:
+    """
+    Insert many dataset records (each a dict of `save_dataset_metadata` keyword
+    arguments) in a single transaction. Returns the number of rows written.
+    """
+    rows = [_dataset_row(**item) for item in items]
+    if not rows:
+        return 0
+    with _write_lock:
+        _conn.executemany(_INSERT_DATASET_SQL, rows)
+        _conn.commit()
+    invalidate_read_cache()
+    return len(rows)
+
+def get_dataset_profile(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Precomputed profile of the dataset stored at `path`:
+    {"summary", "missing", "numeric_columns", "profile_version"} (values may be None).
+    """
+    cur = _read_conn().cursor()
+    cur.execute("SELECT summary, missing, numeric_columns, profile_version FROM datasets WHERE path = ? LIMIT 1", (path,))
+    r = cur.fetchone()
+    if not r:
+        return None
+    item = dict(r)
+    for key in ("summary", "missing", "numeric_columns"):
+        item[key] = _loads(item[key]) if item.get(key) else None
+    return item
+
+def save_dataset_profile(
+    path: str,
+    summary: Dict[str, Any],
+    missing: Dict[str, Any],
+    numeric_columns: List[str],
+    profile_version: str,
+) -> None:
+    with _write_lock:
+        _conn.execute(
+            "UPDATE datasets SET summary = ?, missing = ?, numeric_columns = ?, profile_version = ? WHERE path = ?",
+            (_dumps(summary), _dumps(missing), _dumps(numeric_columns), profile_version, path),
+        )
+        _conn.commit()
 
 def list_datasets(uid: Optional[str] = None) -> List[Dict[str, Any]]:
-    conn = _get_conn()
-    cur = conn.cursor()
+    cur = _read_conn().cursor()
     if uid:
-        cur.execute("SELECT * FROM datasets WHERE TRIM(uploaded_by_uid) = TRIM(?) ORDER BY id DESC", (uid,))
+        cur.execute(f"SELECT {DATASET_COLUMNS} FROM datasets WHERE uploaded_by_uid = ? ORDER BY id DESC", (_clean_uid(uid),))
     else:
-        cur.execute("SELECT * FROM datasets ORDER BY id DESC")
+        cur.execute(f"SELECT {DATASET_COLUMNS} FROM datasets ORDER BY id DESC")
     rows = cur.fetchall()
     result = []
     for r in rows:
         item = dict(r)
-        item["columns"] = json.loads(item.get("columns") or "[]")
-        item["preview"] = json.loads(item.get("preview") or "[]")
+        item["columns"] = _loads(item.get("columns") or "[]")
+        item["preview"] = _loads(item.get("preview") or "[]")
         result.append(item)
     return result
 
+@_cached_read
 def get_dataset_by_filename(filename: str, uid: Optional[str] = None) -> Optional[Dict[str, Any]]:
-    conn = _get_conn()
-    cur = conn.cursor()
+    cur = _read_conn().cursor()
 
     # Try exact match with user filter if available
     if uid:
-        cur.execute("SELECT * FROM datasets WHERE filename = ? AND TRIM(uploaded_by_uid) = TRIM(?) LIMIT 1", (filename, uid))
+        cur.execute(f"SELECT {DATASET_COLUMNS} FROM datasets WHERE filename = ? AND uploaded_by_uid = ? LIMIT 1", (filename, _clean_uid(uid)))
         r = cur.fetchone()
     else:
-        cur.execute("SELECT * FROM datasets WHERE filename = ? LIMIT 1", (filename,))
+        cur.execute(f"SELECT {DATASET_COLUMNS} FROM datasets WHERE filename = ? LIMIT 1", (filename,))
         r = cur.fetchone()
 
     # If not found, try searching by original filename suffix after UUID prefix
     if not r and "_" in filename:
         original_filename = filename.split('_', 1)[-1]
         if uid:
-            cur.execute("SELECT * FROM datasets WHERE filename LIKE ? AND TRIM(uploaded_by_uid) = TRIM(?) LIMIT 1", (f"%_{original_filename}", uid))
+            cur.execute(f"SELECT {DATASET_COLUMNS} FROM datasets WHERE filename LIKE ? AND uploaded_by_uid = ? LIMIT 1", (f"%_{original_filename}", _clean_uid(uid)))
         else:
-            cur.execute("SELECT * FROM datasets WHERE filename LIKE ? LIMIT 1", (f"%_{original_filename}",))
+            cur.execute(f"SELECT {DATASET_COLUMNS} FROM datasets WHERE filename LIKE ? LIMIT 1", (f"%_{original_filename}",))
         r = cur.fetchone()
 
     if not r:
         return None
 
     item = dict(r)
-    item["columns"] = json.loads(item.get("columns") or "[]")
-    item["preview"] = json.loads(item.get("preview") or "[]")
+    item["columns"] = _loads(item.get("columns") or "[]")
+    item["preview"] = _loads(item.get("preview") or "[]")
     return item
 
 def delete_dataset_by_filename(filename: str, uid: Optional[str] = None) -> bool:
-    conn = _get_conn()
-    cur = conn.cursor()
-    if uid:
-        cur.execute("DELETE FROM datasets WHERE filename = ? AND TRIM(uploaded_by_uid) = TRIM(?)", (filename, uid))
-    else:
-        cur.execute("DELETE FROM datasets WHERE filename = ?", (filename,))
-    affected = cur.rowcount
-    conn.commit()
+    with _write_lock:
+        cur = _conn.cursor()
+        if uid:
+            cur.execute("DELETE FROM datasets WHERE filename = ? AND uploaded_by_uid = ?", (filename, _clean_uid(uid)))
+        else:
+            cur.execute("DELETE FROM datasets WHERE filename = ?", (filename,))
+        affected = cur.rowcount
+        _conn.commit()
+    invalidate_read_cache()
     return affected > 0
 
 # --- Model metadata management --- #
 
-def save_model_metadata(
+def _model_row(
     name: str,
     session_id: str,
     task: str,
@@ -151,98 +326,168 @@ def save_model_metadata(
     metrics: Dict[str, Any],
     saved_location: str,
     uploaded_by_uid: Optional[str] = None,
-) -> int:
-    conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO models (name, session_id, task, algorithm, dataset_name, metrics, saved_location, uploaded_by_uid, created_at) VALUES (?,?,?,?,?,?,?,?,?)",
-        (
-            name,
-            session_id,
-            task,
-            algorithm,
-            dataset_name,
-            json.dumps(metrics),
-            saved_location,
-            uploaded_by_uid,
-            datetime.utcnow().isoformat(),
-        ),
+) -> tuple:
+    return (
+        name,
+        session_id,
+        task,
+        algorithm,
+        dataset_name,
+        _dumps(metrics),
+        saved_location,
+        _clean_uid(uploaded_by_uid),
+        datetime.utcnow().isoformat(),
     )
-    conn.commit()
-    return cur.lastrowid
+
+def save_model_metadata(*args, **kwargs) -> int:
+    """
+    Insert one model record (arguments as for `_model_row`) and return its id.
+    """
+    row = _model_row(*args, **kwargs)
+    with _write_lock:
+        cur = _conn.cursor()
+        cur.execute(_INSERT_MODEL_SQL, row)
+        _conn.commit()
+        new_id = cur.lastrowid
+    invalidate_read_cache()
+    return new_id
+
+def save_models_metadata_bulk(items: List[Dict[str, Any]]) -> int:
+    """
+    Insert many model records (each a dict of `save_model_metadata` keyword
+    arguments) in a single transaction. Returns the number of rows written.
+    """
+    rows = [_model_row(**item) for item in items]
+    if not rows:
+        return 0
+    with _write_lock:
+        _conn.executemany(_INSERT_MODEL_SQL, rows)
+        _conn.commit()
+    invalidate_read_cache()
+    return len(rows)
 
 def get_saved_model_by_name(name: str, uid: Optional[str] = None) -> Optional[Dict[str, Any]]:
-    conn = _get_conn()
-    cur = conn.cursor()
+    cur = _read_conn().cursor()
     if uid:
-        cur.execute("SELECT * FROM models WHERE name = ? AND TRIM(uploaded_by_uid) = TRIM(?) LIMIT 1", (name, uid))
+        cur.execute("SELECT * FROM models WHERE name = ? AND uploaded_by_uid = ? LIMIT 1", (name, _clean_uid(uid)))
     else:
         cur.execute("SELECT * FROM models WHERE name = ? LIMIT 1", (name,))
     r = cur.fetchone()
     if not r:
         return None
     item = dict(r)
-    item["metrics"] = json.loads(item.get("metrics") or "{}")
+    item["metrics"] = _loads(item.get("metrics") or "{}")
     return item
 
+@_cached_read
 def list_saved_models_for_user(uid: str) -> List[Dict[str, Any]]:
-    conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM models WHERE TRIM(uploaded_by_uid) = TRIM(?) ORDER BY id DESC", (uid,))
+    cur = _read_conn().cursor()
+    cur.execute("SELECT * FROM models WHERE uploaded_by_uid = ? ORDER BY id DESC", (_clean_uid(uid),))
     rows = cur.fetchall()
     result = []
     for r in rows:
         item = dict(r)
-        item["metrics"] = json.loads(item.get("metrics") or "{}")
+        item["metrics"] = _loads(item.get("metrics") or "{}")
+        result.append(item)
+    return result
+
+@_cached_read
+def list_saved_models_for_user_lite(uid: str) -> List[Dict[str, Any]]:
+    """
+    Rows for the saved-models listing: no storage/session columns, and metrics without
+    the per-model feature list (fetch that with get_model_features).
+    """
+    cur = _read_conn().cursor()
+    try:
+        cur.execute(
+            f"SELECT {MODEL_LIST_COLUMNS}, json_remove(metrics, '$.features') AS metrics"
+            " FROM models WHERE uploaded_by_uid = ? ORDER BY id DESC",
+            (_clean_uid(uid),),
+        )
+        rows = cur.fetchall()
+    except sqlite3.OperationalError:
+        # Older rows may hold NaN literals, which SQLite's JSON parser rejects
+        keys = [c.strip() for c in MODEL_LIST_COLUMNS.split(",")]
+        result = []
+        for m in list_saved_models_for_user(uid):
+            item = {k: m.get(k) for k in keys}
+            item["metrics"] = {k: v for k, v in m["metrics"].items() if k != "features"}
+            result.append(item)
+        return result
+    result = []
+    for r in rows:
+        item = dict(r)
+        item["metrics"] = _loads(item.get("metrics") or "{}")
         result.append(item)
     return result
 
+@_cached_read
 def get_saved_model_by_id(model_id: int, uid: Optional[str] = None) -> Optional[Dict[str, Any]]:
-    conn = _get_conn()
-    cur = conn.cursor()
+    cur = _read_conn().cursor()
     if uid:
-        cur.execute("SELECT * FROM models WHERE id = ? AND TRIM(uploaded_by_uid) = TRIM(?) LIMIT 1", (model_id, uid))
+        cur.execute("SELECT * FROM models WHERE id = ? AND uploaded_by_uid = ? LIMIT 1", (model_id, _clean_uid(uid)))
     else:
         cur.execute("SELECT * FROM models WHERE id = ? LIMIT 1", (model_id,))
     r = cur.fetchone()
     if not r:
         return None
     item = dict(r)
-    item["metrics"] = json.loads(item.get("metrics") or "{}")
+    item["metrics"] = _loads(item.get("metrics") or "{}")
     return item
 
+@_cached_read
+def get_model_features(model_id: int, uid: Optional[str] = None) -> Optional[List[str]]:
+    """
+    Feature names stored in a model's metrics, extracted by SQLite so the rest of the
+    metrics blob is never decoded. Returns None if the model does not exist.
+    """
+    cur = _read_conn().cursor()
+    sql = "SELECT json_extract(metrics, '$.features') FROM models WHERE id = ?"
+    try:
+        if uid:
+            cur.execute(sql + " AND uploaded_by_uid = ? LIMIT 1", (model_id, _clean_uid(uid)))
+        else:
+            cur.execute(sql + " LIMIT 1", (model_id,))
+        r = cur.fetchone()
+    except sqlite3.OperationalError:
+        # Older rows may hold NaN literals, which SQLite's JSON parser rejects
+        model = get_saved_model_by_id(model_id, uid=uid)
+        return model["metrics"].get("features", []) if model else None
+    if not r:
+        return None
+    return _loads(r[0] or "[]")
+
 def delete_model(model_id: int, uid: str) -> bool:
     """
     Delete model record for given model_id and user uid.
     Returns True if a row was deleted, False otherwise.
     """
-    conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM models WHERE id = ? AND TRIM(uploaded_by_uid) = TRIM(?)", (model_id, uid))
-    affected = cur.rowcount
-    conn.commit()
+    with _write_lock:
+        cur = _conn.cursor()
+        cur.execute("DELETE FROM models WHERE id = ? AND uploaded_by_uid = ?", (model_id, _clean_uid(uid)))
+        affected = cur.rowcount
+        _conn.commit()
+    invalidate_read_cache()
     return affected > 0
 
 def list_saved_models() -> List[Dict[str, Any]]:
-    conn = _get_conn()
-    cur = conn.cursor()
+    cur = _read_conn().cursor()
     cur.execute("SELECT * FROM models ORDER BY id DESC")
     rows = cur.fetchall()
     result = []
     for r in rows:
         item = dict(r)
-        item["metrics"] = json.loads(item.get("metrics") or "{}")
+        item["metrics"] = _loads(item.get("metrics") or "{}")
         result.append(item)
     return result
 
 def get_last_n_models(n: int = 3) -> List[Dict[str, Any]]:
-    conn = _get_conn()
-    cur = conn.cursor()
+    cur = _read_conn().cursor()
     cur.execute("SELECT * FROM models ORDER BY id DESC LIMIT ?", (n,))
     rows = cur.fetchall()
     result = []
     for r in rows:
         item = dict(r)
-        item["metrics"] = json.loads(item.get("metrics") or "{}")
+        item["metrics"] = _loads(item.get("metrics") or "{}")
         result.append(item)
     return result
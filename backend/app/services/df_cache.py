@@ -0,0 +1,43 @@
+# backend/app/services/df_cache.py
+import os
+import functools
+from typing import Hashable, Optional, Tuple
+
+import pandas as pd
+
+from app.config import settings
+from app.services import storage
+
+
+def dataset_version(path_or_uri: str) -> Hashable:
+    """
+    Cheap fingerprint of a dataset's current contents:
+    (st_mtime_ns, st_size) for local files, the object's ETag for s3:// URIs.
+    """
+    if isinstance(path_or_uri, str) and path_or_uri.startswith("s3://"):
+        return storage.s3_object_etag(path_or_uri)
+    st = os.stat(path_or_uri)
+    return (st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=settings.df_cache_size)
+def _load_cached(path_or_uri: str, version: Hashable, columns: Optional[Tuple[str, ...]]) -> pd.DataFrame:
+    return storage.load_dataset(path_or_uri, columns=list(columns) if columns is not None else None)
+
+
+def load_dataframe(path_or_uri: str, columns: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+    """
+    Load a dataset (optionally only some columns), reusing the previous parse
+    while the underlying file is unchanged.
+    The returned DataFrame is shared between callers and must not be mutated.
+    """
+    if not (isinstance(path_or_uri, str) and path_or_uri.startswith("s3://")):
+        path_or_uri = os.path.abspath(path_or_uri)
+    return _load_cached(path_or_uri, dataset_version(path_or_uri), columns)
+
+
+def invalidate() -> None:
+    """
+    Drop every cached DataFrame (e.g. after a dataset is deleted).
+    """
+    _load_cached.cache_clear()
@@ -1,60 +1,122 @@
 # backend/app/services/evaluation.py
 import io
-import base64
+import threading
+from functools import partial
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score,
     roc_curve, auc, confusion_matrix, r2_score, mean_squared_error,
     silhouette_score
 )
 
-def _encode_fig_to_base64(fig):
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", bbox_inches="tight")
-    plt.close(fig)
-    buf.seek(0)
-    b64 = base64.b64encode(buf.read()).decode("utf-8")
-    return "data:image/png;base64," + b64
+# silhouette_score is O(n^2); larger clusterings are scored on a fixed-seed sample
+SILHOUETTE_SAMPLE_SIZE = 2000
 
 
-def classification_metrics_plots(y_true, y_pred, y_prob=None, labels=None):
-    metrics = {}
-    metrics["accuracy"] = float(accuracy_score(y_true, y_pred))
-    metrics["precision"] = float(precision_score(y_true, y_pred, average="macro", zero_division=0))
-    metrics["recall"] = float(recall_score(y_true, y_pred, average="macro", zero_division=0))
-    metrics["f1"] = float(f1_score(y_true, y_pred, average="macro", zero_division=0))
+# One Figure/Axes per thread, cleared between plots instead of rebuilt. Built without
+# pyplot, so nothing is registered with (or must be closed in) its global figure manager.
+_fig_cache = threading.local()
 
-    result = {"metrics": metrics}
 
-    # Confusion matrix
-    cm = confusion_matrix(y_true, y_pred)
-    fig, ax = plt.subplots(figsize=(4, 3))
-    im = ax.imshow(cm, cmap="Blues")
+def _get_fig():
+    fig = getattr(_fig_cache, "fig", None)
+    if fig is None:
+        fig = Figure(figsize=(4, 3))
+        FigureCanvasAgg(fig)
+        _fig_cache.fig, _fig_cache.ax = fig, fig.add_subplot()
+    else:
+        _fig_cache.ax.cla()
+        _fig_cache.ax.set_aspect("auto")  # cla() keeps the equal aspect imshow sets
+    return fig, _fig_cache.ax
+
+
+def _render_png(fig) -> bytes:
+    buf = io.BytesIO()
+    fig.tight_layout()
+    fig.canvas.print_png(buf)
+    return buf.getvalue()
+
+
+def _plot_confusion_matrix(cm, labels=None) -> bytes:
+    fig, ax = _get_fig()
+    ax.imshow(cm, cmap="Blues")
     ax.set_xlabel("Predicted")
     ax.set_ylabel("Actual")
     if labels:
         ax.set_xticks(np.arange(len(labels))); ax.set_xticklabels(labels, rotation=45)
         ax.set_yticks(np.arange(len(labels))); ax.set_yticklabels(labels)
-    for i in range(cm.shape[0]):
-        for j in range(cm.shape[1]):
-            ax.text(j, i, cm[i, j], ha="center", va="center", color="black")
-    fig.tight_layout()
-    result["confusion_matrix"] = _encode_fig_to_base64(fig)
+    for (i, j), v in np.ndenumerate(cm):
+        ax.text(j, i, v, ha="center", va="center", color="black")
+    return _render_png(fig)
+
+
+def _plot_roc_curve(fpr, tpr, roc_auc) -> bytes:
+    fig, ax = _get_fig()
+    ax.plot(fpr, tpr, label=f"AUC = {roc_auc:.3f}")
+    ax.plot([0,1],[0,1],"--", color="gray")
+    ax.set_xlabel("False Positive Rate")
+    ax.set_ylabel("True Positive Rate")
+    ax.set_title("ROC Curve")
+    ax.legend(loc="lower right")
+    return _render_png(fig)
+
+
+def _plot_scatter(y_true, y_pred) -> bytes:
+    fig, ax = _get_fig()
+    ax.scatter(y_true, y_pred, alpha=0.6)
+    lo = min(y_true.min(), y_pred.min())
+    hi = max(y_true.max(), y_pred.max())
+    ax.plot([lo, hi], [lo, hi], color="red", linestyle="--")
+    ax.set_xlabel("Actual")
+    ax.set_ylabel("Predicted")
+    ax.set_title("Actual vs Predicted")
+    return _render_png(fig)
+
+
+def _safe_ratio(num, den):
+    # zero_division=0 semantics of sklearn's scorers
+    return np.divide(num, den, out=np.zeros(len(num), dtype=float), where=den > 0)
+
+
+def _scores_from_confusion_matrix(cm):
+    """
+    Accuracy and macro-averaged precision/recall/F1 (zero_division=0) read off the
+    confusion matrix; equal to sklearn's scorers over the same label set.
+    """
+    cm = np.asarray(cm, dtype=float)
+    tp = np.diag(cm)
+    predicted = cm.sum(axis=0)
+    actual = cm.sum(axis=1)
+    total = cm.sum()
+    return {
+        "accuracy": float(tp.sum() / total) if total else 0.0,
+        "precision": float(_safe_ratio(tp, predicted).mean()),
+        "recall": float(_safe_ratio(tp, actual).mean()),
+        "f1": float(_safe_ratio(2 * tp, predicted + actual).mean()),
+    }
+
+
+# Plot entries in the results below are zero-argument callables returning PNG bytes:
+# the data they need is captured now, the (slow) matplotlib rendering happens only
+# when a plot is actually requested.
+
+def classification_metrics_plots(y_true, y_pred, y_prob=None, labels=None):
+    # One confusion matrix feeds every score and the plot
+    cm = confusion_matrix(y_true, y_pred)
+    metrics = _scores_from_confusion_matrix(cm)
+
+    result = {"metrics": metrics}
+
+    # Confusion matrix
+    result["confusion_matrix"] = partial(_plot_confusion_matrix, cm, labels)
 
     # ROC curve (if probabilities available, and binary)
     if y_prob is not None:
         try:
             fpr, tpr, _ = roc_curve(y_true, y_prob)
             roc_auc = auc(fpr, tpr)
-            fig, ax = plt.subplots(figsize=(4, 3))
-            ax.plot(fpr, tpr, label=f"AUC = {roc_auc:.3f}")
-            ax.plot([0,1],[0,1],"--", color="gray")
-            ax.set_xlabel("False Positive Rate")
-            ax.set_ylabel("True Positive Rate")
-            ax.set_title("ROC Curve")
-            ax.legend(loc="lower right")
-            result["roc_curve"] = _encode_fig_to_base64(fig)
+            result["roc_curve"] = partial(_plot_roc_curve, fpr, tpr, roc_auc)
             result["metrics"]["roc_auc"] = float(roc_auc)
         except Exception:
             pass
@@ -71,15 +133,7 @@ def regression_metrics_plots(y_true, y_pred, X_test=None):
     result = {"metrics": metrics}
 
     # Scatter true vs pred
-    fig, ax = plt.subplots(figsize=(4,3))
-    ax.scatter(y_true, y_pred, alpha=0.6)
-    ax.plot([min(y_true.min(), y_pred.min()), max(y_true.max(), y_pred.max())],
-            [min(y_true.min(), y_pred.min()), max(y_true.max(), y_pred.max())],
-            color="red", linestyle="--")
-    ax.set_xlabel("Actual")
-    ax.set_ylabel("Predicted")
-    ax.set_title("Actual vs Predicted")
-    result["scatter"] = _encode_fig_to_base64(fig)
+    result["scatter"] = partial(_plot_scatter, np.asarray(y_true), np.asarray(y_pred))
 
     return result
 
@@ -87,7 +141,8 @@ def regression_metrics_plots(y_true, y_pred, X_test=None):
 def clustering_metrics_plots(X, labels):
     result = {}
     try:
-        sil = float(silhouette_score(X, labels))
+        sample_size = SILHOUETTE_SAMPLE_SIZE if len(labels) > SILHOUETTE_SAMPLE_SIZE else None
+        sil = float(silhouette_score(X, labels, sample_size=sample_size, random_state=0))
         result["metrics"] = {"silhouette": sil}
     except Exception:
         result["metrics"] = {}
@@ -1,10 +1,26 @@
 import os
+import threading
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 import logging
 from typing import Dict, Any, Optional, List
+from app.config import settings
+
+# Optional Intel oneDAL-backed estimators; must patch before the sklearn imports below
+try:
+    if settings.use_sklearnex:
+        from sklearnex import patch_sklearn
+        patch_sklearn()
+except Exception:
+    pass
+
 from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
+from sklearn.base import BaseEstimator, TransformerMixin, OneToOneFeatureMixin
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import StandardScaler, MinMaxScaler, OneHotEncoder, FunctionTransformer
 from sklearn.decomposition import PCA
 from sklearn.feature_selection import SelectKBest, f_classif, f_regression
 from sklearn.linear_model import LinearRegression, LogisticRegression
@@ -12,7 +28,7 @@ from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.svm import SVC
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.cluster import KMeans
-from sklearn.metrics import accuracy_score
+from sklearn.utils.validation import check_is_fitted, validate_data
 from joblib import dump
 import joblib
 from app.services import storage, evaluation, registry
@@ -22,25 +38,119 @@ logger = logging.getLogger(__name__)
 # optional imblearn SMOTE
 try:
     from imblearn.over_sampling import SMOTE
+    from imblearn.pipeline import Pipeline as ImbPipeline
     HAS_SMOTE = True
 except Exception:
     HAS_SMOTE = False
 
 
+# flag -> keyword groups; a flag is on when every keyword of any one of its groups
+# appears in the lowercased improve_with text
+_FLAG_TABLE = (
+    ("imputation", frozenset({("imputation",), ("handle missing",)})),
+    ("standardize", frozenset({("standardiz",)})),
+    ("normalize", frozenset({("normaliz",)})),
+    ("pca", frozenset({("pca",)})),
+    ("smote", frozenset({("smote",)})),
+    ("feature_selection", frozenset({("feature", "selection")})),
+    ("hyperparameter_tuning", frozenset({("hyperparameter",), ("tuning",)})),
+    ("polynomial", frozenset({("polynomial",)})),
+    ("encoding", frozenset({("encode",), ("encoding",)})),
+    ("remove_outliers", frozenset({("outlier",)})),
+)
+
+
 def _match_flags(user_flags: List[str]) -> Dict[str, bool]:
-    flags_str = " ".join([str(f).lower() for f in (user_flags or [])])
-    return {
-        "imputation": "imputation" in flags_str or "handle missing" in flags_str or "handle missing values" in flags_str,
-        "standardize": "standardiz" in flags_str or "standardization" in flags_str,
-        "normalize": "normaliz" in flags_str or "normalization" in flags_str,
-        "pca": "pca" in flags_str,
-        "smote": "smote" in flags_str,
-        "feature_selection": "feature selection" in flags_str or ("feature" in flags_str and "selection" in flags_str),
-        "hyperparameter_tuning": "hyperparameter" in flags_str or "tuning" in flags_str,
-        "polynomial": "polynomial" in flags_str,
-        "encoding": "encode" in flags_str or "encoding" in flags_str,
-        "remove_outliers": "outlier" in flags_str or "remove outliers" in flags_str,
-    }
+    low = " ".join(str(f).lower() for f in (user_flags or ()))
+    return {name: any(all(k in low for k in group) for group in groups) for name, groups in _FLAG_TABLE}
+
+
+def _to_float32(X):
+    """
+    float32 copy of a numeric frame / dense or sparse matrix. Frames come out as one
+    C-contiguous array, so the steps after it never touch pandas blocks.
+    """
+    if isinstance(X, pd.DataFrame):
+        return np.ascontiguousarray(X.to_numpy(dtype=np.float32, na_value=np.nan))
+    return X.astype(np.float32)
+
+
+class QuantileClipper(OneToOneFeatureMixin, TransformerMixin, BaseEstimator):
+    """
+    Clips every column to the [lower, upper] quantiles seen at fit time
+    (the "remove outliers" step). NaNs are ignored when fitting and passed through.
+    """
+
+    def __init__(self, lower: float = 0.01, upper: float = 0.99):
+        self.lower = lower
+        self.upper = upper
+
+    def fit(self, X, y=None):
+        X = validate_data(self, X, dtype=(np.float64, np.float32), ensure_all_finite="allow-nan")
+        # Bounds in X's dtype, so clipping float32 data doesn't upcast it
+        self.lower_, self.upper_ = np.nanquantile(X, [self.lower, self.upper], axis=0).astype(X.dtype, copy=False)
+        return self
+
+    def transform(self, X):
+        check_is_fitted(self)
+        X = validate_data(self, X, dtype=(np.float64, np.float32), ensure_all_finite="allow-nan", reset=False)
+        return np.clip(X, self.lower_, self.upper_)
+
+
+# Fitted preprocessing steps, cached on disk by (step parameters, input data) hash.
+# Only used by hyperparameter tuning, where every grid candidate refits the same
+# preprocessing on each fold; for a single fit, hashing and writing the transformed
+# matrices costs more than it saves.
+_pipeline_memory = (
+    joblib.Memory(settings.pipeline_cache_dir, verbose=0) if settings.pipeline_cache_dir else None
+)
+
+
+def _trim_pipeline_cache() -> None:
+    if _pipeline_memory is None:
+        return
+    try:
+        _pipeline_memory.reduce_size(bytes_limit=settings.pipeline_cache_size)
+    except Exception:
+        logger.exception("Trimming the pipeline cache failed")
+
+
+def _make_estimator(task: str, algorithm: str):
+    algo_key = algorithm.lower().replace(" ", "_")
+    if task == "regression":
+        if algo_key.startswith("linear"):
+            return LinearRegression()
+        elif "random" in algo_key:
+            return RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=settings.estimator_jobs)
+        return LinearRegression()
+    elif task == "classification":
+        if "logistic" in algo_key:
+            return LogisticRegression(max_iter=2000)
+        elif "random" in algo_key:
+            return RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=settings.estimator_jobs)
+        elif "svm" in algo_key:
+            return SVC(probability=True)
+        elif "knn" in algo_key:
+            return KNeighborsClassifier(n_jobs=settings.estimator_jobs)
+        return LogisticRegression(max_iter=2000)
+    elif task == "clustering":
+        return KMeans(n_clusters=3, random_state=42)
+    return None
+
+
+def _tuning_grid(task: str, algorithm: str):
+    """Base estimator and parameter grid searched by hyperparameter tuning, or (None, {})."""
+    algo_key = algorithm.lower()
+    if task == "classification":
+        if "random" in algo_key:
+            # Folds already run in parallel: one core per inner fit
+            return RandomForestClassifier(random_state=42, n_jobs=1), {"n_estimators": [50, 100], "max_depth": [None, 5]}
+        if "logistic" in algo_key:
+            return LogisticRegression(max_iter=2000, solver="lbfgs"), {"C": [0.1, 1.0, 10.0]}
+    elif task == "regression":
+        if "random" in algo_key:
+            return RandomForestRegressor(random_state=42, n_jobs=1), {"n_estimators": [50, 100], "max_depth": [None, 5]}
+    return None, {}
 
 
 def train_model(task: str, algorithm: str, dataset_filename: str, test_size: float = 0.2,
@@ -71,22 +181,34 @@ def train_model(task: str, algorithm: str, dataset_filename: str, test_size: flo
         X = df.drop(columns=[target_col])
         y = df[target_col]
     else:
-        X = df.copy()
+        # The pipeline never modifies its input, so no defensive copy is needed
+        X = df
         y = None
 
-    # Encoding: get_dummies for categorical variables
-    try:
-        X = pd.get_dummies(X, drop_first=True)
-    except Exception as e:
-        logger.exception("Failed during get_dummies: %s", e)
-        raise RuntimeError(f"Failed to encode categorical features: {e}")
-
-    if X.shape[1] == 0:
-        raise RuntimeError("No features remain after encoding. Check input dataset and encoding options.")
+    # Column groups for the ColumnTransformer; it selects them by name, so the saved
+    # pipeline predicts straight from the raw feature columns
+    num_cols = X.select_dtypes(include=[np.number]).columns.tolist()
+    bool_cols = X.select_dtypes(include=["bool"]).columns.tolist()
+    cat_cols = X.select_dtypes(include=["object", "category", "string"]).columns.tolist()
+    if not (num_cols or bool_cols or cat_cols):
+        raise RuntimeError("No usable feature columns. Check input dataset and encoding options.")
 
     # Capture feature names for saving
     features = list(X.columns)
 
+    # 11. Create model (first: the dtype it works in shapes the preprocessing)
+    try:
+        model = _make_estimator(task, algorithm)
+    except Exception as e:
+        logger.exception("Failed to construct model: %s", e)
+        raise RuntimeError(f"Failed to initialize model: {e}")
+
+    # Everything after encoding runs in float32: half the memory and bandwidth of float64.
+    # libsvm (SVC) only works in float64 and would copy the data back, so it keeps float64.
+    float_dtype = np.float64 if isinstance(model, SVC) else np.float32
+    if y is not None and y.dtype.kind == "f":
+        y = y.astype(float_dtype, copy=False)
+
     # Split dataset into train/test (if classification use stratify)
     try:
         if task in ("regression", "classification"):
@@ -95,7 +217,7 @@ def train_model(task: str, algorithm: str, dataset_filename: str, test_size: flo
                 stratify=y if task == "classification" else None
             )
         else:
-            X_train = X.copy()
+            X_train = X
             X_test = None
             y_train = None
             y_test = None
@@ -106,222 +228,190 @@ def train_model(task: str, algorithm: str, dataset_filename: str, test_size: flo
     pipeline_info = {"applied": []}
     transformers = {}
 
-    # 2. Imputation
+    # 2-9. Preprocessing steps. Everything is assembled into one Pipeline
+    # (ColumnTransformer -> SelectKBest -> PCA -> clipping -> SMOTE -> estimator) that is
+    # fitted once, refitted per fold by GridSearchCV and saved whole.
+    num_steps, cat_steps, steps = [], [], []
+    if float_dtype is np.float32:
+        num_steps.append(("f32", FunctionTransformer(_to_float32, feature_names_out="one-to-one")))
+
+    # Columns the encoded matrix will have (one per category seen in training, minus the
+    # dropped first one)
+    n_encoded = len(num_cols) + len(bool_cols) + sum(
+        max(int(X_train[c].nunique(dropna=flags["imputation"])) - 1, 0) for c in cat_cols
+    )
+
+    # 2. Imputation (train median / mode)
     if flags["imputation"]:
-        try:
-            for col in X_train.columns:
-                if X_train[col].dtype.kind in 'biufc':
-                    median = X_train[col].median()
-                    X_train[col] = X_train[col].fillna(median)
-                    X_test[col] = X_test[col].fillna(median) if X_test is not None else X_test
-                else:
-                    mode_val = X_train[col].mode().iloc[0] if not X_train[col].mode().empty else ""
-                    X_train[col] = X_train[col].fillna(mode_val)
-                    X_test[col] = X_test[col].fillna(mode_val) if X_test is not None else X_test
-            pipeline_info["applied"].append("Imputation")
-            transformers["imputation"] = True
-        except Exception as e:
-            logger.exception("Imputation failed: %s", e)
-            raise RuntimeError(f"Imputation failed: {e}")
+        num_steps.append(("imp", SimpleImputer(strategy="median")))
+        cat_steps.append(("imp", SimpleImputer(strategy="most_frequent")))
+        pipeline_info["applied"].append("Imputation")
+        transformers["imputation"] = True
 
     # 3. Feature selection (SelectKBest)
     if flags["feature_selection"]:
-        try:
-            k = min(10, X_train.shape[1])
-            if task == "classification":
-                selector = SelectKBest(score_func=f_classif, k=k)
-            else:
-                selector = SelectKBest(score_func=f_regression, k=k)
-            selector.fit(X_train.values, y_train.values if y_train is not None else None)
-            cols_mask = selector.get_support(indices=True)
-            selected_cols = [X_train.columns[i] for i in cols_mask]
-            X_train = X_train[selected_cols]
-            X_test = X_test[selected_cols] if X_test is not None else X_test
+        if task in ("regression", "classification"):
+            k = max(min(10, n_encoded), 1)
+            score_func = f_classif if task == "classification" else f_regression
+            steps.append(("sel", SelectKBest(score_func=score_func, k=k)))
+            n_encoded = k
             pipeline_info["applied"].append(f"FeatureSelection(k={k})")
-            transformers["feature_selection"] = {"k": k, "cols": selected_cols}
-        except Exception as e:
-            logger.exception("Feature selection failed: %s", e)
-            raise RuntimeError(f"Feature selection failed: {e}")
+            transformers["feature_selection"] = {"k": k}
+        else:
+            logger.warning("Feature selection needs a target column; skipped for clustering.")
 
-    # 4. Standardization / Normalization
+    # 4. Standardization / Normalization (numeric columns only)
     if flags["standardize"] or flags["normalize"]:
-        try:
-            numeric_cols = X_train.select_dtypes(include=[np.number]).columns.tolist()
-            if len(numeric_cols) == 0:
-                logger.warning("No numeric columns available for scaling.")
-            else:
-                if flags["standardize"]:
-                    scaler = StandardScaler()
-                    scaler.fit(X_train[numeric_cols])
-                    X_train[numeric_cols] = scaler.transform(X_train[numeric_cols])
-                    if X_test is not None:
-                        X_test[numeric_cols] = scaler.transform(X_test[numeric_cols])
-                    pipeline_info["applied"].append("Standardization")
-                    transformers["scaler"] = ("standard", numeric_cols)
-                elif flags["normalize"]:
-                    scaler = MinMaxScaler()
-                    scaler.fit(X_train[numeric_cols])
-                    X_train[numeric_cols] = scaler.transform(X_train[numeric_cols])
-                    if X_test is not None:
-                        X_test[numeric_cols] = scaler.transform(X_test[numeric_cols])
-                    pipeline_info["applied"].append("Normalization")
-                    transformers["scaler"] = ("minmax", numeric_cols)
-        except Exception as e:
-            logger.exception("Scaling failed: %s", e)
-            raise RuntimeError(f"Scaling failed: {e}")
-
-    # 5. PCA
+        if len(num_cols) == 0:
+            logger.warning("No numeric columns available for scaling.")
+        elif flags["standardize"]:
+            num_steps.append(("sc", StandardScaler()))
+            pipeline_info["applied"].append("Standardization")
+            transformers["scaler"] = ("standard", num_cols)
+        else:
+            num_steps.append(("sc", MinMaxScaler()))
+            pipeline_info["applied"].append("Normalization")
+            transformers["scaler"] = ("minmax", num_cols)
+
+    # 5. PCA. The covariance solver takes the sparse one-hot matrix as is (centering
+    # implicitly), so it is never densified
+    use_pca = False
     if flags["pca"]:
-        try:
-            num_cols = X_train.select_dtypes(include=[np.number]).shape[1]
-            if num_cols <= 1:
-                logger.warning("Not enough numeric features for PCA.")
-            else:
-                pca = PCA(n_components=0.95)
-                pca.fit(X_train.select_dtypes(include=[np.number]))
-                X_train_pca = pca.transform(X_train.select_dtypes(include=[np.number]))
-                X_test_pca = pca.transform(X_test.select_dtypes(include=[np.number])) if X_test is not None else None
-                X_train = pd.DataFrame(X_train_pca, index=X_train.index)
-                X_test = pd.DataFrame(X_test_pca, index=X_test.index) if X_test is not None else X_test
-                pipeline_info["applied"].append("PCA")
-                transformers["pca"] = {"n_components": pca.n_components_}
-        except Exception as e:
-            logger.exception("PCA failed: %s", e)
-            raise RuntimeError(f"PCA failed: {e}")
-
-    # 6. Remove outliers
+        if n_encoded <= 1:
+            logger.warning("Not enough numeric features for PCA.")
+        else:
+            use_pca = True
+            steps.append(("pca", PCA(n_components=0.95, svd_solver="covariance_eigh" if cat_cols else "auto")))
+            pipeline_info["applied"].append("PCA")
+
+    # 6. Remove outliers: clip to the train 1st/99th percentiles, on the PCA components
+    # when PCA runs, else on the numeric columns
     if flags["remove_outliers"]:
-        try:
-            num_cols = X_train.select_dtypes(include=[np.number]).columns.tolist()
-            for c in num_cols:
-                q1 = X_train[c].quantile(0.01)
-                q99 = X_train[c].quantile(0.99)
-                X_train[c] = X_train[c].clip(lower=q1, upper=q99)
-                if X_test is not None:
-                    X_test[c] = X_test[c].clip(lower=q1, upper=q99)
-            pipeline_info["applied"].append("RemoveOutliers(1-99pct)")
-            transformers["remove_outliers"] = True
-        except Exception as e:
-            logger.exception("Remove outliers failed: %s", e)
-            raise RuntimeError(f"Remove outliers failed: {e}")
+        if use_pca:
+            steps.append(("clip", QuantileClipper(0.01, 0.99)))
+        elif num_cols:
+            num_steps.append(("clip", QuantileClipper(0.01, 0.99)))
+        pipeline_info["applied"].append("RemoveOutliers(1-99pct)")
+        transformers["remove_outliers"] = True
 
     # 7. Polynomial features not implemented (placeholder)
     if flags["polynomial"]:
         pipeline_info["applied"].append("PolynomialFeatures(not_implemented_placeholder)")
 
-    # 8. Encoding already handled earlier with get_dummies
+    # 8. Categorical columns are always one-hot encoded into a sparse CSR block
+    cat_steps.append(("ohe", OneHotEncoder(
+        drop="first", handle_unknown="ignore", sparse_output=True, dtype=float_dtype,
+    )))
     if flags["encoding"]:
-        pipeline_info["applied"].append("Encoding(already_applied_get_dummies)")
-
-    # 9. SMOTE
+        pipeline_info["applied"].append("Encoding(already_applied_one_hot)")
+
+    column_parts = []
+    if num_cols:
+        column_parts.append(("num", Pipeline(num_steps) if num_steps else "passthrough", num_cols))
+    if bool_cols:
+        column_parts.append(("bool", "passthrough", bool_cols))
+    if cat_cols:
+        column_parts.append(("cat", Pipeline(cat_steps), cat_cols))
+    preprocess = ColumnTransformer(
+        column_parts,
+        sparse_threshold=0.3,
+        verbose_feature_names_out=False,
+    )
+    steps.insert(0, ("pre", preprocess))
+
+    # 9. SMOTE (resamples the training data only, so it needs imblearn's Pipeline)
+    pipeline_cls = Pipeline
     if flags["smote"] and task == "classification":
         if not HAS_SMOTE:
             logger.warning("SMOTE requested but imblearn is not available.")
         else:
+            steps.append(("smote", SMOTE(random_state=42)))
+            pipeline_cls = ImbPipeline
+            pipeline_info["applied"].append("SMOTE")
+            transformers["smote"] = True
+
+    pipe = pipeline_cls(steps + [("est", model)])
+
+    # 10. Hyperparameter tuning over the whole pipeline: preprocessing is refitted on
+    # each fold's training part, and the refitted best pipeline is the final model
+    fitted = False
+    if flags["hyperparameter_tuning"]:
+        base, param_grid = _tuning_grid(task, algorithm)
+        if base is not None:
             try:
-                sm = SMOTE(random_state=42)
-                X_train, y_train = sm.fit_resample(X_train, y_train)
-                pipeline_info["applied"].append("SMOTE")
-                transformers["smote"] = True
-            except Exception as e:
-                logger.exception("SMOTE failed: %s", e)
-                raise RuntimeError(f"SMOTE failed: {e}")
-
-    # 10. Hyperparameter tuning
-    do_tuning = flags["hyperparameter_tuning"]
-    search_best = None
-    if do_tuning:
-        try:
-            algo_key = algorithm.lower()
-            if task == "classification":
-                if "random" in algo_key:
-                    base = RandomForestClassifier(random_state=42)
-                    param_grid = {"n_estimators": [50, 100], "max_depth": [None, 5]}
-                elif "logistic" in algo_key:
-                    base = LogisticRegression(max_iter=2000, solver="lbfgs")
-                    param_grid = {"C": [0.1, 1.0, 10.0]}
-                else:
-                    base = None; param_grid = {}
-                if base is not None:
-                    grid = GridSearchCV(base, param_grid, cv=3, scoring="accuracy", n_jobs=1)
-                    grid.fit(X_train, y_train)
-                    best = grid.best_estimator_
-                    logger.info("Hyperparameter tuning: best params %s", grid.best_params_)
-                    search_best = best
-                    pipeline_info["applied"].append("HyperparameterTuning")
-                    transformers["hyperparam"] = {"best_params": grid.best_params_}
-            elif task == "regression":
-                if "random" in algo_key:
-                    base = RandomForestRegressor(random_state=42)
-                    param_grid = {"n_estimators": [50, 100], "max_depth": [None, 5]}
-                else:
-                    base = None; param_grid = {}
-                if base is not None:
-                    grid = GridSearchCV(base, param_grid, cv=3, scoring="r2", n_jobs=1)
+                grid = GridSearchCV(
+                    # Candidates share each fold's fitted preprocessing through the cache
+                    pipe.set_params(est=base, memory=_pipeline_memory),
+                    {f"est__{k}": v for k, v in param_grid.items()},
+                    cv=3, scoring="accuracy" if task == "classification" else "r2",
+                    n_jobs=settings.grid_search_jobs, pre_dispatch="2*n_jobs",
+                )
+                with joblib.parallel_backend("loky"):
                     grid.fit(X_train, y_train)
-                    best = grid.best_estimator_
-                    search_best = best
-                    pipeline_info["applied"].append("HyperparameterTuning")
-                    transformers["hyperparam"] = {"best_params": grid.best_params_}
-        except Exception as e:
-            logger.exception("Hyperparameter tuning failed: %s", e)
-            pipeline_info.setdefault("warnings", []).append(f"Hyperparameter tuning failed: {e}")
-
-    # 11. Create model or use search_best
-    algo_key = algorithm.lower().replace(" ", "_")
-    model = None
-    try:
-        if search_best is not None:
-            model = search_best
-        else:
-            if task == "regression":
-                if algo_key.startswith("linear"):
-                    model = LinearRegression()
-                elif "random" in algo_key:
-                    model = RandomForestRegressor(n_estimators=100, random_state=42)
-                else:
-                    model = LinearRegression()
-            elif task == "classification":
-                if "logistic" in algo_key:
-                    model = LogisticRegression(max_iter=2000)
-                elif "random" in algo_key:
-                    model = RandomForestClassifier(n_estimators=100, random_state=42)
-                elif "svm" in algo_key:
-                    model = SVC(probability=True)
-                elif "knn" in algo_key:
-                    model = KNeighborsClassifier()
-                else:
-                    model = LogisticRegression(max_iter=2000)
-            elif task == "clustering":
-                if "kmeans" in algo_key or "k-means" in algo_key:
-                    model = KMeans(n_clusters=3, random_state=42)
-                else:
-                    model = KMeans(n_clusters=3, random_state=42)
-    except Exception as e:
-        logger.exception("Failed to construct model: %s", e)
-        raise RuntimeError(f"Failed to initialize model: {e}")
+                best_params = {k[len("est__"):]: v for k, v in grid.best_params_.items()}
+                logger.info("Hyperparameter tuning: best params %s", best_params)
+                pipe = grid.best_estimator_
+                # Later predictions use every core again
+                if isinstance(pipe[-1], (RandomForestClassifier, RandomForestRegressor)):
+                    pipe[-1].set_params(n_jobs=settings.estimator_jobs)
+                fitted = True
+                pipeline_info["applied"].append("HyperparameterTuning")
+                transformers["hyperparam"] = {"best_params": best_params}
+            except Exception as e:
+                logger.exception("Hyperparameter tuning failed: %s", e)
+                pipeline_info.setdefault("warnings", []).append(f"Hyperparameter tuning failed: {e}")
+                pipe.set_params(est=model, memory=None)
 
-    # 12. Fit model on X_train
+    # 12. Fit pipeline on X_train
     try:
         if task in ("regression", "classification"):
-            model.fit(X_train, y_train)
-            preds = model.predict(X_test)
+            if not fitted:
+                pipe.fit(X_train, y_train)
+            preds = pipe.predict(X_test)
         else:
-            model.fit(X_train)
-            preds = model.predict(X_train) if hasattr(model, "predict") else model.labels_
+            if not fitted:
+                pipe.fit(X_train)
+            preds = pipe[-1].labels_
     except Exception as e:
         logger.exception("Model training failed: %s", e)
         raise RuntimeError(f"Model training failed: {e}")
 
+    if "feature_selection" in transformers:
+        try:
+            # Names flow through the whole prefix; the selector alone only saw an array
+            names = pipe[:list(pipe.named_steps).index("sel") + 1].get_feature_names_out()
+            transformers["feature_selection"]["cols"] = names.tolist()
+        except Exception:
+            logger.exception("Could not resolve the selected feature names")
+    if "pca" in pipe.named_steps:
+        transformers["pca"] = {"n_components": int(pipe.named_steps["pca"].n_components_)}
+    if "remove_outliers" in transformers:
+        # Per-column clip bounds, to reproduce the step outside the saved pipeline
+        try:
+            if "clip" in pipe.named_steps:
+                clipper = pipe.named_steps["clip"]
+                names = pipe[:list(pipe.named_steps).index("clip")].get_feature_names_out()
+            else:
+                num_pipe = pipe.named_steps["pre"].named_transformers_["num"]
+                clipper = num_pipe.named_steps["clip"]
+                names = num_pipe.get_feature_names_out(num_cols)
+            transformers["remove_outliers"] = {
+                "lower": dict(zip(names.tolist(), clipper.lower_.tolist())),
+                "upper": dict(zip(names.tolist(), clipper.upper_.tolist())),
+            }
+        except Exception:
+            logger.exception("Could not record the outlier clip bounds")
+            pipeline_info.setdefault("warnings", []).append("Outlier clip bounds could not be recorded")
+
     # 13. Evaluate
     eval_result = {}
     plots = {}
     try:
         if task == "classification":
             y_prob = None
-            if hasattr(model, "predict_proba"):
+            if hasattr(pipe, "predict_proba"):
                 try:
-                    prob = model.predict_proba(X_test)
+                    prob = pipe.predict_proba(X_test)
                     y_prob = prob[:, 1] if prob.ndim == 2 and prob.shape[1] == 2 else prob
                 except Exception:
                     y_prob = None
@@ -331,7 +421,7 @@ def train_model(task: str, algorithm: str, dataset_filename: str, test_size: flo
             eval_result = evaluation.regression_metrics_plots(y_test, preds, X_test)
             plots = {"scatter": eval_result.get("scatter")}
         else:
-            eval_result = evaluation.clustering_metrics_plots(X_train, preds)
+            eval_result = evaluation.clustering_metrics_plots(pipe[:-1].transform(X_train), preds)
             plots = {}
     except Exception as e:
         logger.exception("Evaluation failed: %s", e)
@@ -340,10 +430,13 @@ def train_model(task: str, algorithm: str, dataset_filename: str, test_size: flo
 
     metrics = eval_result.get("metrics", {})
 
-    # 14. Save model and register session
+    # 14. Save the fitted pipeline and register session. The saved copy doesn't point
+    # at this server's cache directory.
+    pipe.set_params(memory=None)
+    _trim_pipeline_cache()
     try:
         safe_model_name = f"{os.path.splitext(os.path.basename(dataset_filename))[0]}_{algorithm.replace(' ','_')}.pkl"
-        local_model_path = storage.save_joblib_model(model, safe_model_name, user_uid)
+        local_model_path = storage.save_joblib_model(pipe, safe_model_name, user_uid)
     except Exception as e:
         logger.exception("Failed to save model: %s", e)
         raise RuntimeError(f"Failed to save model: {e}")
@@ -372,16 +465,65 @@ def train_model(task: str, algorithm: str, dataset_filename: str, test_size: flo
     }
 
 
+# LRU of unpickled models keyed by (path, mtime_ns): a re-saved file is loaded afresh
+_model_cache: "OrderedDict[tuple, Any]" = OrderedDict()
+_model_cache_lock = threading.Lock()
+
+
+def load_model(model_filepath: str):
+    """
+    joblib.load with an in-process LRU cache, so repeated predictions against the
+    same saved model skip the disk read and unpickling.
+    """
+    try:
+        key = (model_filepath, os.stat(model_filepath).st_mtime_ns)
+    except OSError:
+        return joblib.load(model_filepath, mmap_mode=storage.MODEL_MMAP_MODE)
+
+    with _model_cache_lock:
+        model = _model_cache.get(key)
+        if model is not None:
+            _model_cache.move_to_end(key)
+            return model
+
+    model = joblib.load(model_filepath, mmap_mode=storage.MODEL_MMAP_MODE)
+    with _model_cache_lock:
+        _model_cache[key] = model
+        _model_cache.move_to_end(key)
+        while len(_model_cache) > max(settings.model_cache_size, 0):
+            _model_cache.popitem(last=False)
+    return model
+
+
+_BOOL_STRINGS = {"true": True, "false": False, "1": True, "0": False, "yes": True, "no": False}
+
+
+def _coerce_inputs(model, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Manual inputs arrive as strings: lay them out as the training columns and parse
+    the ones the saved pipeline treats as numbers / booleans (missing ones become NaN).
+    Models saved before pipelines existed are passed the frame unchanged.
+    """
+    pre = model.named_steps.get("pre") if isinstance(model, Pipeline) else None
+    if pre is None:
+        return df
+    if hasattr(model, "feature_names_in_"):
+        df = df.reindex(columns=model.feature_names_in_)
+    for name, _, cols in pre.transformers_:
+        if name == "num":
+            df[cols] = df[cols].apply(pd.to_numeric, errors="coerce")
+        elif name == "bool":
+            df[cols] = df[cols].apply(lambda s: s.astype(str).str.strip().str.lower().map(_BOOL_STRINGS))
+    return df
+
+
 def predict_manual(model_filepath: str, inputs: dict):
     # Load the trained model
-    model = joblib.load(model_filepath)
+    model = load_model(model_filepath)
 
     # Convert inputs dict to DataFrame with a single row
     df = pd.DataFrame([inputs])
-
-    # Optionally convert input values to numeric types here
-    # for col in df.columns:
-    #     df[col] = pd.to_numeric(df[col], errors='ignore')
+    df = _coerce_inputs(model, df)
 
     # Perform prediction
     preds = model.predict(df)
@@ -394,14 +536,23 @@ def predict_manual(model_filepath: str, inputs: dict):
 
 def predict_bulk(model_filepath: str, input_filepath: str):
     # Load the trained model
-    model = joblib.load(model_filepath)
+    model = load_model(model_filepath)
 
-    # Load input data from file (assumed csv, can add excel support)
+    # CSVs are streamed and predicted block by block, so only one block of rows is in
+    # memory at a time next to the growing prediction list
     ext = os.path.splitext(input_filepath)[1].lower()
     if ext == ".csv":
-        df = pd.read_csv(input_filepath)
+        preds = []
+        try:
+            for batch in storage.iter_csv_batches(input_filepath):
+                preds.extend(model.predict(batch).tolist())
+            return preds
+        except storage.CSV_STREAM_ERRORS as e:
+            # A later block didn't match the column types inferred from the first one
+            logger.info("Streaming %s failed (%s); predicting on the whole file", input_filepath, e)
+            df = pd.read_csv(input_filepath)
     else:
-        df = pd.read_excel(input_filepath, engine="openpyxl")
+        df = storage.read_excel(input_filepath)
 
     # Perform batch predictions
     preds = model.predict(df)
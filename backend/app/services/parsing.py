@@ -1,34 +1,205 @@
 # backend/app/services/parsing.py
 import os
+import datetime
+from itertools import islice
 import pandas as pd
-from typing import Dict, Any
+import openpyxl
+from typing import Dict, Any, List, Optional
+
+from app.services.storage import arrow_header_ok, load_dataset, read_excel, python_calamine
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except Exception:
+    pa = None
+    pc = None
+    pacsv = None
+
+# The Arrow CSV reader parses one block at a time; previews only touch the first one(s)
+PREVIEW_BLOCK_SIZE = 1 << 20  # 1 MiB
 
 def _is_csv(path: str) -> bool:
     return os.path.splitext(path)[1].lower() == ".csv"
 
+def _json_safe(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def _open_preview_reader(path: str, column_types=None):
+    return pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=PREVIEW_BLOCK_SIZE),
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True, column_types=column_types),
+    )
+
+
+def _csv_preview_rows(path: str, rows: int) -> Optional[List[Dict[str, Any]]]:
+    reader = _open_preview_reader(path)
+    if not arrow_header_ok(reader.schema.names):
+        # Blank / duplicate headers: let pandas rename them to match the column list
+        return None
+    temporal = {f.name: pa.string() for f in reader.schema if pa.types.is_temporal(f.type)}
+    if temporal:
+        # pandas.read_csv leaves dates as text; show them the same way
+        reader = _open_preview_reader(path, temporal)
+
+    batches = []
+    n = 0
+    while n < rows:
+        try:
+            batch = reader.read_next_batch()
+        except StopIteration:
+            break
+        batch = batch.slice(0, rows - n)
+        batches.append(batch)
+        n += batch.num_rows
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+
+    # Text columns get "" for missing values inside Arrow; the few numeric/bool
+    # nulls left over are patched on the row dicts afterwards.
+    columns = []
+    for col in table.columns:
+        if pa.types.is_null(col.type):
+            col = col.cast(pa.string())
+        if pa.types.is_string(col.type) or pa.types.is_large_string(col.type):
+            col = pc.fill_null(col, "")
+        columns.append(col)
+    table = pa.Table.from_arrays(columns, names=table.column_names)
+    records = table.to_pylist()
+
+    null_cols = [name for name, col in zip(table.column_names, table.columns) if col.null_count]
+    if null_cols:
+        for r in records:
+            for name in null_cols:
+                if r[name] is None:
+                    r[name] = ""
+    return records
+
+
+def _calamine_preview_rows(path: str, rows: int) -> List[Dict[str, Any]]:
+    wb = python_calamine.CalamineWorkbook.from_path(path)
+    try:
+        values = wb.get_sheet_by_index(0).to_python(nrows=rows + 1)
+    finally:
+        wb.close()
+    if not values:
+        return []
+    cols = [str(h) if h not in (None, "") else f"Unnamed: {i}" for i, h in enumerate(values[0])]
+    return [dict(zip(cols, r)) for r in values[1:]]
+
+
+def _excel_preview_rows(path: str, rows: int) -> List[Dict[str, Any]]:
+    if python_calamine is not None:
+        return _calamine_preview_rows(path, rows)
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        it = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(it, None)
+        if header is None:
+            return []
+        cols = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+        records = []
+        for values in islice(it, rows):
+            values = tuple(values) + (None,) * (len(cols) - len(values))
+            records.append(dict(zip(cols, values)))
+        return records
+    finally:
+        wb.close()
+
+
+def _csv_row_count(path: str) -> Optional[int]:
+    """
+    Data rows in a CSV file, counted in one streaming pass of Arrow's CSV parser over
+    the first column (read as text, so nothing is type-inferred), minus the header.
+    Quote-aware and, like pandas, blank lines are skipped. Returns None when Arrow can't
+    parse the file (or pyarrow is missing), in which case the caller falls back to a
+    full parse.
+    """
+    if pacsv is None:
+        return None
+    try:
+        reader = pacsv.open_csv(
+            path,
+            # The header is read as a data row, so duplicate or blank names don't matter
+            read_options=pacsv.ReadOptions(autogenerate_column_names=True),
+            convert_options=pacsv.ConvertOptions(include_columns=["f0"], column_types={"f0": pa.string()}),
+        )
+        return max(sum(batch.num_rows for batch in reader) - 1, 0)
+    except (pa.ArrowInvalid, StopIteration):
+        return None
+
+
+def _excel_row_count(path: str) -> Optional[int]:
+    """
+    Data rows in the first sheet, taken from the sheet dimensions without reading
+    any cells. Returns None when the count can't be trusted (sheet not anchored at A1,
+    missing dimension record), in which case the caller falls back to a full parse.
+    """
+    if python_calamine is not None:
+        wb = python_calamine.CalamineWorkbook.from_path(path)
+        try:
+            sheet = wb.get_sheet_by_index(0)
+            if sheet.height == 0:
+                return 0
+            if sheet.start is None or sheet.start[0] != 0:
+                return None
+            return max(sheet.height - 1, 0)
+        finally:
+            wb.close()
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        max_row = wb.worksheets[0].max_row
+        return max(max_row - 1, 0) if max_row is not None else None
+    finally:
+        wb.close()
+
+
+def read_preview(path: str, rows: int = 10) -> List[Dict[str, Any]]:
+    """
+    Returns the first `rows` rows of a local CSV/Excel file as JSON-ready dicts.
+    Only the leading block of the file is parsed, so the cost is O(rows x cols)
+    regardless of file size. Missing values are rendered as "".
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Dataset not found at path: {path}")
+    if _is_csv(path):
+        records = _csv_preview_rows(path, rows) if pacsv is not None else None
+        if records is not None:
+            return records
+        df = pd.read_csv(path, nrows=rows)
+        return df.fillna("").to_dict(orient="records")
+    records = _excel_preview_rows(path, rows)
+    return [{k: _json_safe(v) for k, v in r.items()} for r in records]
+
+
 def extract_preview_and_metadata(path: str, preview_rows: int = 10) -> Dict[str, Any]:
     """
     Returns a dict with keys: columns, preview (list of dict rows), row_count, dtypes_sample, missing_sample
     """
-    ext = os.path.splitext(path)[1].lower()
+    preview = read_preview(path, preview_rows)
     if _is_csv(path):
-        # preview
-        df_preview = pd.read_csv(path, nrows=preview_rows)
-        cols = list(df_preview.columns)
-        preview = df_preview.fillna("").to_dict(orient="records")
-        # row count (efficient): read with chunks
-        row_count = 0
-        for chunk in pd.read_csv(path, chunksize=100000):
-            row_count += len(chunk)
-        sample = pd.read_csv(path, nrows=min(1000, row_count+1))
+        row_count = _csv_row_count(path)
+        sample = load_dataset(path, nrows=1000)
     else:
-        # excel
-        df_preview = pd.read_excel(path, engine="openpyxl", nrows=preview_rows)
-        cols = list(df_preview.columns)
-        preview = df_preview.fillna("").to_dict(orient="records")
-        full_df = pd.read_excel(path, engine="openpyxl")
+        # Excel: row count from the sheet dimensions, sample from the first 1000 rows
+        try:
+            row_count = _excel_row_count(path)
+        except Exception:
+            row_count = None
+        if row_count is not None:
+            sample = read_excel(path, nrows=1000)
+    if row_count is None:
+        # One full parse (calamine when available) gives the row count and sample
+        full_df = load_dataset(path)
         row_count = len(full_df)
         sample = full_df.head(1000)
+    cols = list(sample.columns)
 
     dtypes_sample = {c: str(sample[c].dtype) for c in sample.columns}
     missing_sample = {c: int(sample[c].isna().sum()) for c in sample.columns}
@@ -0,0 +1,146 @@
+# backend/app/services/profiling.py
+# Column profile of a dataset (EDA summary + missing report). Computed at upload and
+# stored with the dataset metadata, keyed by file version, so EDA can serve it from the DB.
+from typing import Any, Dict
+
+import pandas as pd
+
+from app.services import storage
+from app.services import df_cache
+
+
+def _none_if_nan(v: Any) -> Any:
+    return None if pd.isna(v) else v
+
+
+def _summarize_column(col_data: pd.Series) -> Dict[str, Any]:
+    """
+    Per-column fallback for dtypes the vectorized pass doesn't cover (bool, datetime, ...).
+    """
+    info: Dict[str, Any] = {
+        "dtype": str(col_data.dtype),
+        "count": int(col_data.count()),
+        "n_missing": int(col_data.isna().sum()),
+    }
+
+    if pd.api.types.is_numeric_dtype(col_data):
+        try:
+            desc = col_data.describe().to_dict()
+            numeric_stats = {k: (None if pd.isna(v) else (float(v) if not isinstance(v, (int, float)) else v)) for k, v in desc.items()}
+            info["numeric"] = numeric_stats
+            try:
+                info["skew"] = _none_if_nan(float(col_data.skew()))
+                info["kurtosis"] = _none_if_nan(float(col_data.kurtosis()))
+            except Exception:
+                info["skew"] = None
+                info["kurtosis"] = None
+        except Exception:
+            info["numeric"] = {}
+    else:
+        try:
+            vc = col_data.dropna().astype(str).value_counts()
+            top = vc.index[0] if len(vc) > 0 else None
+            top_freq = int(vc.iloc[0]) if len(vc) > 0 else None
+            unique = int(col_data.nunique(dropna=True))
+            info.update({"unique": unique, "top": top, "top_freq": top_freq})
+        except Exception:
+            info.update({"unique": int(col_data.nunique(dropna=True)), "top": None, "top_freq": None})
+    return info
+
+
+def summarize(df: pd.DataFrame) -> Dict[str, Any]:
+    counts = df.count().to_dict()
+    n_missing = df.isna().sum().to_dict()
+
+    numeric = df.select_dtypes(include="number")
+    num_desc: Dict[str, Dict[str, Any]] = {}
+    skews: Dict[str, Any] = {}
+    kurts: Dict[str, Any] = {}
+    if numeric.shape[1] > 0:
+        num_desc = numeric.describe().to_dict()
+        skews = numeric.skew().to_dict()
+        kurts = numeric.kurt().to_dict()
+
+    categorical = df.select_dtypes(include=["object", "string", "category"])
+    cat_desc: Dict[str, Dict[str, Any]] = {}
+    if categorical.shape[1] > 0:
+        cat_desc = categorical.describe(include="all").to_dict()
+
+    summary: Dict[str, Any] = {}
+    for col in df.columns:
+        if col in num_desc:
+            summary[col] = {
+                "dtype": str(df.dtypes[col]),
+                "count": int(counts[col]),
+                "n_missing": int(n_missing[col]),
+                "numeric": {k: (None if pd.isna(v) else float(v)) for k, v in num_desc[col].items()},
+                "skew": _none_if_nan(skews.get(col)),
+                "kurtosis": _none_if_nan(kurts.get(col)),
+            }
+        elif col in cat_desc:
+            desc = cat_desc[col]
+            top = desc.get("top")
+            summary[col] = {
+                "dtype": str(df.dtypes[col]),
+                "count": int(counts[col]),
+                "n_missing": int(n_missing[col]),
+                "unique": int(desc["unique"]) if not pd.isna(desc.get("unique")) else 0,
+                "top": None if pd.isna(top) else str(top),
+                "top_freq": None if pd.isna(desc.get("freq")) else int(desc["freq"]),
+            }
+        else:
+            summary[col] = _summarize_column(df[col])
+
+    return {"columns": list(summary.keys()), "summary": summary}
+
+
+def missing_report(df: pd.DataFrame) -> Dict[str, Any]:
+    total = len(df)
+    missing = []
+    for col in df.columns:
+        nmiss = int(df[col].isna().sum())
+        pct = (nmiss / total * 100.0) if total > 0 else 0.0
+        missing.append({"column": col, "missing_count": nmiss, "missing_pct": round(pct, 4)})
+    missing_sorted = sorted(missing, key=lambda x: x["missing_count"], reverse=True)
+    high_missing = [m for m in missing_sorted if m["missing_pct"] >= 30.0]
+    return {"total_rows": total, "missing": missing_sorted, "high_missing": high_missing}
+
+
+def numeric_columns(df: pd.DataFrame) -> list:
+    return list(df.select_dtypes(include=["number"]).columns)
+
+
+def profile_version(path_or_uri: str) -> str:
+    """
+    Version string stored with a profile; a mismatch means the file changed.
+    """
+    return repr(df_cache.dataset_version(path_or_uri))
+
+
+def build_profile(df: pd.DataFrame, version: str) -> Dict[str, Any]:
+    return {
+        "summary": summarize(df),
+        "missing": missing_report(df),
+        "numeric_columns": numeric_columns(df),
+        "profile_version": version,
+    }
+
+
+def extract_profile(path: str, preview_rows: int = 10) -> Dict[str, Any]:
+    """
+    Upload-time metadata (same keys as parsing.extract_preview_and_metadata)
+    plus the column profile, all from a single full parse of the file.
+    Top-level so it can run in the upload process pool.
+    """
+    version = profile_version(path)  # taken before reading: a later change invalidates the profile
+    df = storage.load_dataset(path)
+    sample = df.head(1000)
+    metadata = {
+        "columns": list(df.columns),
+        "preview": df.head(preview_rows).fillna("").to_dict(orient="records"),
+        "row_count": int(len(df)),
+        "dtypes_sample": {c: str(sample[c].dtype) for c in sample.columns},
+        "missing_sample": {c: int(sample[c].isna().sum()) for c in sample.columns},
+    }
+    metadata.update(build_profile(df, version))
+    return metadata
@@ -2,10 +2,37 @@
 import uuid
 import time
 import os
+import threading
 from typing import Dict, Any, Optional
 
-# Simple in-memory registry: session_id -> metadata
-_REG: Dict[str, Dict[str, Any]] = {}
+from app.config import settings
+
+try:
+    import diskcache
+except Exception:
+    diskcache = None
+
+# Registry: session_id -> {"created_at", "metadata"}.
+# With diskcache installed the sessions live in an on-disk SQLite store shared by every
+# worker process and kept across restarts, with least-recently-used eviction past
+# session_store_size bytes. Without it they fall back to a per-process dict.
+if diskcache is not None:
+    _REG = diskcache.Cache(
+        settings.session_dir,
+        size_limit=settings.session_store_size,
+        eviction_policy="least-recently-used",
+    )
+else:
+    _REG: Dict[str, Dict[str, Any]] = {}
+
+_dict_lock = threading.Lock()
+
+def _transaction():
+    """
+    Serializes read-modify-write updates of a record: a diskcache transaction (which
+    also excludes other worker processes) or a process lock for the dict fallback.
+    """
+    return _REG.transact() if diskcache is not None else _dict_lock
 
 def create_session(metadata: Dict[str, Any]) -> str:
     """
@@ -22,8 +49,24 @@ def set_session(sid: str, key: str, value: Any) -> None:
     """
     Sets a key-value pair within an existing session's metadata.
     """
-    if sid in _REG:
-        _REG[sid]["metadata"][key] = value
+    # Records read from diskcache are copies, so the updated record is written back;
+    # inside the transaction so concurrent updates aren't lost and a session deleted
+    # in the meantime isn't brought back
+    with _transaction():
+        sess = _REG.get(sid)
+        if sess is not None:
+            sess["metadata"][key] = value
+            _REG[sid] = sess
+
+def set_session_plot(sid: str, name: str, png: bytes) -> None:
+    """
+    Stores one rendered plot of an existing session, leaving its other plots as they are.
+    """
+    with _transaction():
+        sess = _REG.get(sid)
+        if sess is not None:
+            sess["metadata"].setdefault("plots", {})[name] = png
+            _REG[sid] = sess
 
 def get_session(sid: str) -> Optional[Dict[str, Any]]:
     """
@@ -35,15 +78,13 @@ def delete_session(sid: str) -> None:
     """
     Deletes a session and its associated temporary model file.
     """
-    if sid in _REG:
+    sess = _REG.pop(sid, None)
+    if sess is not None:
         # Remove any temporary model files
         try:
-            model_path = _REG[sid]["metadata"].get("model_local_path")
+            model_path = sess["metadata"].get("model_local_path")
             if model_path and os.path.exists(model_path):
                 os.remove(model_path)
         except Exception:
             # Log the error but don't fail if cleanup fails
             pass
-        finally:
-            # Delete the session from the registry
-            del _REG[sid]
\ No newline at end of file
@@ -1,7 +1,12 @@
 import os
+import time
 import shutil
 import logging
-from typing import Optional
+from typing import Iterator, Optional, List
+from functools import lru_cache, partial
+import aiofiles
+import anyio
+import numpy as np
 import pandas as pd
 from uuid import uuid4
 from joblib import dump, load
@@ -13,20 +18,212 @@ logger = logging.getLogger(__name__)
 
 try:
     import boto3
+    from boto3.s3.transfer import TransferConfig
     from botocore.exceptions import ClientError
 except Exception:
     boto3 = None
+    TransferConfig = None
     ClientError = None
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as pq
+except Exception:
+    pa = None
+    pacsv = None
+    pads = None
+    pq = None
+
+PARQUET_SUFFIX = ".parquet"
+
+# Rust-backed Excel reader; openpyxl (pure Python) is the fallback
+try:
+    import python_calamine
+    EXCEL_ENGINE = "calamine"
+except Exception:
+    python_calamine = None
+    EXCEL_ENGINE = "openpyxl"
+
+# Saved models: LZ4 makes them several times smaller (and S3 uploads faster) at almost
+# no CPU cost. joblib can't memory-map compressed files, so without lz4 they're written
+# uncompressed and memory-mapped on load instead (see model_trainer.load_model).
+try:
+    import lz4  # noqa: F401  registers joblib's "lz4" compressor
+    MODEL_COMPRESS = ("lz4", 3)
+except Exception:
+    MODEL_COMPRESS = 0
+MODEL_MMAP_MODE = None if MODEL_COMPRESS else "r"
+
+
+def read_excel(path: str, **kwargs) -> pd.DataFrame:
+    """
+    pandas.read_excel with the fastest available engine. If calamine rejects a
+    workbook, openpyxl gets a second try.
+    """
+    try:
+        return pd.read_excel(path, engine=EXCEL_ENGINE, **kwargs)
+    except Exception as e:
+        if EXCEL_ENGINE == "openpyxl" or not path.lower().endswith((".xlsx", ".xlsm")):
+            raise
+        logger.warning(f"calamine could not read {path} ({e}); retrying with openpyxl")
+        return pd.read_excel(path, engine="openpyxl", **kwargs)
+
 
-def save_upload_file(file: UploadFile, user_uid: Optional[str] = None) -> str:
+@lru_cache(maxsize=1)
+def get_s3_client():
+    """
+    Process-wide S3 client. boto3 clients are thread-safe, so one instance is
+    shared by every request instead of re-resolving credentials each time.
+    """
+    if boto3 is None:
+        raise RuntimeError("boto3 is required for S3 storage but is not installed")
+    return boto3.client(
+        "s3",
+        aws_access_key_id=settings.aws_access_key_id,
+        aws_secret_access_key=settings.aws_secret_access_key,
+        region_name=settings.aws_region,
+    )
+
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB per read from the incoming UploadFile
+S3_PART_SIZE = 16 * 1024 * 1024  # S3 requires every multipart part but the last to be >= 5 MiB
+
+# boto3 managed transfers (download_file / upload_file) split files above the threshold
+# into S3_PART_SIZE parts moved over s3_max_concurrency parallel connections
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=S3_PART_SIZE,
+    max_concurrency=settings.s3_max_concurrency,
+    use_threads=True,
+) if TransferConfig is not None else None
+
+
+class FileTooLargeError(ValueError):
+    """Raised when an upload exceeds settings.max_file_size."""
+
+
+def _check_size(written: int, max_bytes: Optional[int]) -> None:
+    if max_bytes and written > max_bytes:
+        raise FileTooLargeError(f"File exceeds maximum allowed size of {max_bytes} bytes")
+
+
+async def write_upload_to_path(
+    file: UploadFile,
+    dest_path: str,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+    max_bytes: Optional[int] = None,
+) -> int:
+    """
+    Stream an UploadFile to dest_path in fixed-size chunks so memory stays bounded.
+    Returns the number of bytes written. The partial file is removed on failure.
+    """
+    written = 0
+    try:
+        async with aiofiles.open(dest_path, "wb") as out:
+            while chunk := await file.read(chunk_size):
+                written += len(chunk)
+                _check_size(written, max_bytes)
+                await out.write(chunk)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    return written
+
+
+async def _stream_upload_to_s3(file: UploadFile, bucket: str, key: str, max_bytes: Optional[int] = None) -> None:
+    """
+    Upload an UploadFile to S3 part by part with the multipart API.
+    Up to s3_max_concurrency parts are in flight at once while the next ones are read;
+    the blocking boto3 calls run in worker threads so the event loop stays free.
+    """
+    s3_client = get_s3_client()
+    upload = await anyio.to_thread.run_sync(
+        partial(s3_client.create_multipart_upload, Bucket=bucket, Key=key, ACL="private")
+    )
+    upload_id = upload["UploadId"]
+    etags = {}
+    errors = []
+    in_flight = anyio.Semaphore(max(settings.s3_max_concurrency, 1))
+
+    async def upload_part(part_number: int, chunk: bytes, cancel_scope) -> None:
+        try:
+            resp = await anyio.to_thread.run_sync(
+                partial(
+                    s3_client.upload_part,
+                    Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=chunk,
+                )
+            )
+            etags[part_number] = resp["ETag"]
+        except Exception as e:
+            errors.append(e)
+            cancel_scope.cancel()
+        finally:
+            in_flight.release()
+
+    try:
+        written = 0
+        part_number = 0
+        # Failures are collected and re-raised below so callers see the original
+        # exception rather than an ExceptionGroup
+        async with anyio.create_task_group() as tg:
+            while True:
+                await in_flight.acquire()
+                chunk = await file.read(S3_PART_SIZE)
+                if not chunk:
+                    in_flight.release()
+                    break
+                written += len(chunk)
+                try:
+                    _check_size(written, max_bytes)
+                except FileTooLargeError as e:
+                    errors.append(e)
+                    tg.cancel_scope.cancel()
+                    break
+                part_number += 1
+                tg.start_soon(upload_part, part_number, chunk, tg.cancel_scope)
+        if errors:
+            raise errors[0]
+
+        if not etags:
+            # Multipart uploads need at least one part; store empty files directly
+            await anyio.to_thread.run_sync(
+                partial(s3_client.abort_multipart_upload, Bucket=bucket, Key=key, UploadId=upload_id)
+            )
+            await anyio.to_thread.run_sync(
+                partial(s3_client.put_object, Bucket=bucket, Key=key, Body=b"", ACL="private")
+            )
+            return
+
+        parts = [{"ETag": etags[n], "PartNumber": n} for n in sorted(etags)]
+        await anyio.to_thread.run_sync(
+            partial(
+                s3_client.complete_multipart_upload,
+                Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts},
+            )
+        )
+    except BaseException:
+        try:
+            await anyio.to_thread.run_sync(
+                partial(s3_client.abort_multipart_upload, Bucket=bucket, Key=key, UploadId=upload_id)
+            )
+        except Exception:
+            logger.exception(f"Failed to abort multipart upload for s3://{bucket}/{key}")
+        raise
+
+
+async def save_upload_file(file: UploadFile, user_uid: Optional[str] = None) -> str:
     """
     Save an uploaded file under the user's directory (or default upload dir).
     Supports local filesystem and S3 backend if configured.
+    The upload is streamed in chunks, never buffered whole in memory.
     Returns the saved file path or S3 URI.
     """
     filename = file.filename
     unique_name = f"{uuid4().hex}_{filename}"
+    max_bytes = settings.max_file_size or None
 
     if settings.storage_backend == "local":
         if user_uid:
@@ -36,26 +233,17 @@ def save_upload_file(file: UploadFile, user_uid: Optional[str] = None) -> str:
         else:
             dest_path = os.path.join(settings.upload_dir, unique_name)
 
-        with open(dest_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
+        await write_upload_to_path(file, dest_path, max_bytes=max_bytes)
         return dest_path
 
     elif settings.storage_backend == "s3":
         if boto3 is None:
             raise RuntimeError("boto3 is required for S3 storage but is not installed")
 
-        s3_client = boto3.client(
-            "s3",
-            aws_access_key_id=settings.aws_access_key_id,
-            aws_secret_access_key=settings.aws_secret_access_key,
-            region_name=getattr(settings, "aws_region", None),
-        )
-
         prefix = f"{user_uid}/" if user_uid else ""
         s3_key = f"datasets/{prefix}{unique_name}"
 
-        s3_client.upload_fileobj(file.file, settings.aws_s3_bucket, s3_key, ExtraArgs={"ACL": "private"})
+        await _stream_upload_to_s3(file, settings.aws_s3_bucket, s3_key, max_bytes=max_bytes)
         uri = f"s3://{settings.aws_s3_bucket}/{s3_key}"
         return uri
 
@@ -63,14 +251,16 @@ def save_upload_file(file: UploadFile, user_uid: Optional[str] = None) -> str:
         raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
 
 
-def load_dataset(path_or_uri: str, nrows: Optional[int] = None) -> pd.DataFrame:
+def load_dataset(path_or_uri: str, nrows: Optional[int] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
     """
     Load dataset from a local path or S3 URI, supports CSV and Excel files.
+    If columns is given, only those columns are read from the file.
     """
     if not path_or_uri:
         raise FileNotFoundError("Empty dataset path provided")
 
-    if isinstance(path_or_uri, str) and path_or_uri.startswith("s3://"):
+    from_s3 = isinstance(path_or_uri, str) and path_or_uri.startswith("s3://")
+    if from_s3:
         if boto3 is None:
             raise RuntimeError("boto3 required to read s3:// URIs")
 
@@ -80,19 +270,14 @@ def load_dataset(path_or_uri: str, nrows: Optional[int] = None) -> pd.DataFrame:
         except ValueError:
             raise RuntimeError("Invalid s3 URI")
 
-        s3 = boto3.client(
-            "s3",
-            aws_access_key_id=settings.aws_access_key_id,
-            aws_secret_access_key=settings.aws_secret_access_key,
-            region_name=getattr(settings, "aws_region", None),
-        )
+        s3 = get_s3_client()
 
-        tmp_dir = os.path.join(settings.upload_dir, "tmp")
+        tmp_dir = settings.temp_dir
         os.makedirs(tmp_dir, exist_ok=True)
         tmp_path = os.path.join(tmp_dir, os.path.basename(key))
 
         try:
-            s3.download_file(bucket, key, tmp_path)
+            s3.download_file(bucket, key, tmp_path, Config=S3_TRANSFER_CONFIG)
             path_or_uri = tmp_path
         except ClientError as e:
             if os.path.exists(tmp_path):
@@ -102,16 +287,235 @@ def load_dataset(path_or_uri: str, nrows: Optional[int] = None) -> pd.DataFrame:
     if not os.path.exists(path_or_uri):
         raise FileNotFoundError(f"Dataset not found at path: {path_or_uri}")
 
+    sidecar = fresh_parquet_sidecar(path_or_uri) if nrows is None else None
+    if sidecar:
+        try:
+            return pd.read_parquet(sidecar, engine="pyarrow", columns=columns)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable Parquet copy {sidecar}: {e}")
+
     ext = os.path.splitext(path_or_uri)[1].lower()
     try:
         if ext == ".csv":
-            df = pd.read_csv(path_or_uri, nrows=nrows)
+            df = _read_csv_arrow(path_or_uri, columns) if nrows is None else None
+            if df is None:
+                df = pd.read_csv(path_or_uri, nrows=nrows, usecols=columns)
         else:
-            df = pd.read_excel(path_or_uri, engine="openpyxl", nrows=nrows)
-        return df
+            df = read_excel(path_or_uri, nrows=nrows, usecols=columns)
     except Exception as e:
         raise RuntimeError(f"Failed to read dataset: {e}")
 
+    # First full parse of a local file: keep a columnar copy so later loads skip it
+    if nrows is None and columns is None and not from_s3 and pq is not None:
+        try:
+            _write_sidecar(path_or_uri, df)
+        except Exception as e:
+            logger.warning(f"Could not write Parquet copy of {path_or_uri}: {e}")
+    return df
+
+
+def arrow_header_ok(names: List[str]) -> bool:
+    """
+    False when a CSV header needs pandas' renaming (blank names become
+    "Unnamed: i", duplicates "a.1"), which Arrow doesn't do.
+    """
+    return "" not in names and len(set(names)) == len(names)
+
+
+def _read_csv_arrow(path: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    """
+    Parse a whole CSV with pyarrow's multithreaded reader, typed the way
+    pandas.read_csv types it: dates stay text, missing values become NaN and
+    integer columns with gaps become float64. Returns None (use pandas) when
+    pyarrow is missing, the header needs pandas' renaming (blank or duplicate
+    names) or Arrow can't parse the file consistently.
+    """
+    if pacsv is None:
+        return None
+    try:
+        schema = pacsv.open_csv(path).schema
+        names = schema.names
+        if not arrow_header_ok(names):
+            return None
+        if columns is not None and not set(columns) <= set(names):
+            return None
+        temporal = {f.name: pa.string() for f in schema if pa.types.is_temporal(f.type)}
+        table = pacsv.read_csv(
+            path,
+            convert_options=pacsv.ConvertOptions(
+                strings_can_be_null=True, column_types=temporal or None, include_columns=columns,
+            ),
+        )
+    except (pa.ArrowInvalid, StopIteration) as e:
+        logger.info("Arrow CSV reader fell back to pandas for %s: %s", path, e)
+        return None
+    return _arrow_to_pandas(table)
+
+
+def _arrow_to_pandas(table) -> pd.DataFrame:
+    # All-empty columns come back as Arrow nulls; pandas reads them as float NaN
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    df = table.to_pandas()
+    # Arrow hands back None for missing text; pandas.read_csv uses NaN
+    for name, col in zip(table.column_names, table.columns):
+        if col.null_count and df[name].dtype == object:
+            df[name] = df[name].where(df[name].notna(), np.nan)
+    return df
+
+
+CSV_BATCH_SIZE = 64 * 1024 * 1024  # bytes of CSV text per streamed batch
+
+# Raised by iter_csv_batches when a later block doesn't fit the types of the first one
+CSV_STREAM_ERRORS = (pa.ArrowInvalid,) if pa is not None else ()
+
+
+def iter_csv_batches(path: str, block_size: int = CSV_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream a local CSV as DataFrames of about block_size bytes each with pyarrow's
+    incremental reader, typed like pandas.read_csv (dates as text, missing values NaN).
+    Column types are inferred from the first block; a later block that doesn't fit them
+    raises one of CSV_STREAM_ERRORS. Files Arrow can't take (or no pyarrow) are read
+    whole by pandas and yielded as a single frame.
+    """
+    reader = None
+    if pacsv is not None:
+        try:
+            schema = pacsv.open_csv(path, read_options=pacsv.ReadOptions(block_size=1 << 20)).schema
+            if arrow_header_ok(schema.names):
+                temporal = {f.name: pa.string() for f in schema if pa.types.is_temporal(f.type)}
+                reader = pacsv.open_csv(
+                    path,
+                    read_options=pacsv.ReadOptions(block_size=block_size),
+                    convert_options=pacsv.ConvertOptions(strings_can_be_null=True, column_types=temporal or None),
+                )
+        except (pa.ArrowInvalid, StopIteration) as e:
+            logger.info("Arrow CSV reader fell back to pandas for %s: %s", path, e)
+    if reader is None:
+        yield pd.read_csv(path)
+        return
+    for batch in reader:
+        yield _arrow_to_pandas(pa.Table.from_batches([batch]))
+
+
+def numeric_columns(path: str, sample_rows: int = 1000) -> Optional[List[str]]:
+    """
+    Names of the numeric columns of a local dataset, found without a full parse:
+    from the Parquet schema when a fresh copy exists, otherwise from a sample of
+    the first rows. A column that only looks numeric in the sample is dropped
+    again by select_dtypes after the real load, so the probe is safe.
+    Returns None for S3 URIs (caller should load everything).
+    """
+    if not isinstance(path, str) or path.startswith("s3://"):
+        return None
+    sidecar = fresh_parquet_sidecar(path)
+    if sidecar:
+        sample = pq.read_schema(sidecar).empty_table().to_pandas()
+    else:
+        sample = load_dataset(path, nrows=sample_rows)
+    return list(sample.select_dtypes(include=["number"]).columns)
+
+
+def _csv_format(column_types=None):
+    return pads.CsvFileFormat(
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True, column_types=column_types)
+    )
+
+
+def read_column(path: str, column: str):
+    """
+    Read one column of a local dataset as a pyarrow ChunkedArray, parsing only
+    that column (from the fresh Parquet copy if any, otherwise the CSV itself).
+    Returns None when the column can't be read this way (S3, Excel, missing
+    pyarrow, unknown column name, unparseable CSV) so the caller can fall back
+    to a pandas load.
+    """
+    if pads is None or not isinstance(path, str) or path.startswith("s3://"):
+        return None
+    sidecar = fresh_parquet_sidecar(path)
+    if sidecar:
+        dataset = pads.dataset(sidecar, format="parquet")
+    elif path.lower().endswith(".csv"):
+        dataset = pads.dataset(path, format=_csv_format())
+        if column in dataset.schema.names and pa.types.is_temporal(dataset.schema.field(column).type):
+            # pandas.read_csv leaves dates as text; keep the raw strings too
+            dataset = pads.dataset(path, format=_csv_format({column: pa.string()}))
+    else:
+        return None
+    if column not in dataset.schema.names:
+        return None
+    try:
+        return dataset.to_table(columns=[column]).column(0)
+    except pa.ArrowInvalid as e:
+        logger.warning("Arrow could not read column %r of %s: %s", column, path, e)
+        return None
+
+
+def fresh_parquet_sidecar(path: str) -> Optional[str]:
+    """
+    Return the Parquet copy stored next to a local dataset, if there is one
+    that is at least as new as the source file. Otherwise None.
+    """
+    if pq is None or not isinstance(path, str) or path.startswith("s3://"):
+        return None
+    sidecar = path + PARQUET_SUFFIX
+    try:
+        if os.stat(sidecar).st_mtime_ns >= os.stat(path).st_mtime_ns:
+            return sidecar
+    except OSError:
+        pass
+    return None
+
+
+def _write_sidecar(path: str, df: pd.DataFrame) -> str:
+    sidecar = path + PARQUET_SUFFIX
+    tmp_path = f"{sidecar}.{uuid4().hex}.tmp"  # unique: concurrent first loads may race
+    try:
+        df.to_parquet(tmp_path, engine="pyarrow", compression="zstd", index=False)
+        os.replace(tmp_path, sidecar)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return sidecar
+
+
+def write_parquet_sidecar(path: str) -> Optional[str]:
+    """
+    Make sure a local CSV/Excel dataset has a fresh ZSTD-compressed Parquet copy
+    next to it (<path>.parquet); the first full load_dataset writes it. Later
+    loads read the typed, columnar copy instead of re-parsing text. Returns the
+    Parquet path, or None for S3 datasets, when pyarrow is unavailable or when
+    the frame can't be stored as Parquet.
+    """
+    if pq is None or not isinstance(path, str) or path.startswith("s3://"):
+        return None
+    sidecar = fresh_parquet_sidecar(path)
+    if sidecar is None:
+        load_dataset(path)
+        sidecar = fresh_parquet_sidecar(path)
+    return sidecar
+
+
+def s3_object_etag(uri: str) -> str:
+    """
+    Return the ETag of an S3 object; changes whenever the object is rewritten.
+    """
+    if boto3 is None:
+        raise RuntimeError("boto3 required to read s3:// URIs")
+
+    _, _, rest = uri.partition("s3://")
+    try:
+        bucket, key = rest.split("/", 1)
+    except ValueError:
+        raise RuntimeError("Invalid s3 URI")
+
+    s3 = get_s3_client()
+    try:
+        return s3.head_object(Bucket=bucket, Key=key)["ETag"]
+    except ClientError as e:
+        raise RuntimeError(f"S3 head_object failed: {e}")
+
 
 def save_joblib_model(model, name: str, user_uid: Optional[str] = None) -> str:
     """
@@ -123,7 +527,8 @@ def save_joblib_model(model, name: str, user_uid: Optional[str] = None) -> str:
     if not safe_name.lower().endswith(".pkl"):
         safe_name = safe_name + ".pkl"
     dest = os.path.join(temp_dir, safe_name)
-    dump(model, dest)
+    # Protocol 5 pickles numpy buffers out-of-band, without an extra copy
+    dump(model, dest, compress=MODEL_COMPRESS, protocol=5)
     return dest
 
 
@@ -142,14 +547,11 @@ def save_model_file(local_path: str, dest_name: Optional[str] = None, user_uid:
     if settings.storage_backend == "s3":
         if boto3 is None:
             raise RuntimeError("boto3 required for S3 operations")
-        s3 = boto3.client(
-            "s3",
-            aws_access_key_id=settings.aws_access_key_id,
-            aws_secret_access_key=settings.aws_secret_access_key,
-            region_name=getattr(settings, "aws_region", None),
-        )
+        s3 = get_s3_client()
         s3_key = f"models/{user_uid or 'anonymous'}/{safe_name}"
-        s3.upload_file(local_path, settings.aws_s3_bucket, s3_key, ExtraArgs={"ACL": "private"})
+        s3.upload_file(
+            local_path, settings.aws_s3_bucket, s3_key, ExtraArgs={"ACL": "private"}, Config=S3_TRANSFER_CONFIG
+        )
         uri = f"s3://{settings.aws_s3_bucket}/{s3_key}"
         return uri
     else:
@@ -170,12 +572,7 @@ def delete_file(path_or_uri: str, user_uid: Optional[str] = None) -> bool:
             if boto3 is None:
                 logger.error("boto3 not installed for S3 delete")
                 return False
-            s3 = boto3.client(
-                "s3",
-                aws_access_key_id=settings.aws_access_key_id,
-                aws_secret_access_key=settings.aws_secret_access_key,
-                region_name=settings.aws_region,
-            )
+            s3 = get_s3_client()
             bucket, key = path_or_uri.replace("s3://", "").split("/", 1)
             s3.delete_object(Bucket=bucket, Key=key)
             return True
@@ -187,3 +584,25 @@ def delete_file(path_or_uri: str, user_uid: Optional[str] = None) -> bool:
         os.remove(path_or_uri)
         return True
     return False
+
+
+def sweep_temp_dir(max_age_seconds: float) -> int:
+    """
+    Remove files under settings.temp_dir not modified for max_age_seconds
+    (orphaned bulk-prediction uploads, stale S3 downloads).
+    Returns the number of files removed.
+    """
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for root, _dirs, files in os.walk(settings.temp_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"Could not remove temp file {path}: {e}")
+    return removed
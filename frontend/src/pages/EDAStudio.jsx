@@ -1,5 +1,5 @@
 // src/pages/EDAStudio.jsx
-import React, { useEffect, useState, useRef } from "react";
+import React, { useEffect, useState } from "react";
 import axios from "axios";
 import { auth } from "../firebase";
 
@@ -15,21 +15,12 @@ const EDAStudio = () => {
   const [loading, setLoading] = useState(false);
 
   const [histColumn, setHistColumn] = useState("");
-  const [histSrc, setHistSrc] = useState("");
+  const [histData, setHistData] = useState(null);
   const [chartLoading, setChartLoading] = useState(false);
   const [chartError, setChartError] = useState("");
 
-  // Keep track of object URL so we can revoke it later
-  const objectUrlRef = useRef(null);
-
   useEffect(() => {
     fetchDatasets();
-    return () => {
-      // cleanup any created object URL on unmount
-      if (objectUrlRef.current) {
-        URL.revokeObjectURL(objectUrlRef.current);
-      }
-    };
   }, []);
 
   const fetchDatasets = async () => {
@@ -52,7 +43,7 @@ const EDAStudio = () => {
     setMissing(null);
     setCorrelation(null);
     setHistColumn("");
-    setHistSrc("");
+    setHistData(null);
     setChartError("");
     setLoading(true);
 
@@ -79,38 +70,17 @@ const EDAStudio = () => {
     }
   };
 
-  // Robust show histogram: try direct img src first; if fails due to auth/CORS, fetch via axios with token
+  // Fetch histogram bins / top value counts as JSON and draw them client-side
   const showHistogram = async (col) => {
     if (!selected) return;
     setChartError("");
     setHistColumn(col);
-    setHistSrc("");
+    setHistData(null);
     setChartLoading(true);
 
-    // revoke previous object URL if any
-    if (objectUrlRef.current) {
-      URL.revokeObjectURL(objectUrlRef.current);
-      objectUrlRef.current = null;
-    }
-
     const encodedName = encodeURIComponent(selected);
     const encodedCol = encodeURIComponent(col);
-    const directUrl = `${API_BASE}/eda/${encodedName}/histogram/${encodedCol}`;
-
-    // First try direct URL in img — quick and requires no headers
-    try {
-      const headResp = await fetch(directUrl, { method: "HEAD" });
-      if (headResp.ok) {
-        setHistSrc(directUrl);
-        setChartLoading(false);
-        return;
-      }
-      console.warn("Direct HEAD returned not-ok:", headResp.status);
-    } catch (err) {
-      console.warn("Direct HEAD failed (CORS or network). Will try token fetch.", err);
-    }
 
-    // Fallback: fetch binary via axios while sending Firebase ID token
     try {
       const user = auth?.currentUser;
       let token = null;
@@ -118,20 +88,14 @@ const EDAStudio = () => {
         token = await user.getIdToken(/* forceRefresh */ false);
       }
 
-      const resp = await axios.get(directUrl, {
-        responseType: "blob",
+      const resp = await axios.get(`${API_BASE}/eda/${encodedName}/histogram/${encodedCol}`, {
         headers: token ? { Authorization: `Bearer ${token}` } : {},
       });
-
-      const blob = resp.data;
-      const objUrl = URL.createObjectURL(blob);
-      objectUrlRef.current = objUrl;
-      setHistSrc(objUrl);
+      setHistData(resp.data);
     } catch (err) {
-      console.error("Failed to fetch chart via axios:", err);
+      console.error("Failed to fetch chart data:", err);
       const message =
         err?.response?.data?.detail ||
-        err?.response?.data ||
         err?.message ||
         "Failed to load chart.";
       setChartError(String(message));
@@ -140,6 +104,19 @@ const EDAStudio = () => {
     }
   };
 
+  const formatEdge = (v) => (Number.isInteger(v) ? String(v) : Number(v).toPrecision(4));
+
+  const histogramBars = (data) => {
+    if (!data || !data.counts) return [];
+    if (data.kind === "numeric") {
+      return data.counts.map((count, i) => ({
+        label: `${formatEdge(data.bins[i])} – ${formatEdge(data.bins[i + 1])}`,
+        count,
+      }));
+    }
+    return data.counts.map((count, i) => ({ label: data.labels[i], count }));
+  };
+
   const Card = ({ title, children, icon }) => (
     <div className="bg-white p-6 rounded-xl shadow-lg border border-gray-200">
       <h2 className="text-xl font-bold text-gray-800 mb-4 flex items-center">
@@ -313,10 +290,29 @@ const EDAStudio = () => {
                     <p>{chartError}</p>
                   </div>
                 )}
-                {histSrc ? (
-                  <div className="flex justify-center items-center">
-                    <img src={histSrc} alt={`chart-${histColumn}`} className="rounded-lg shadow-md max-w-full h-auto" />
-                  </div>
+                {histData ? (
+                  (() => {
+                    const bars = histogramBars(histData);
+                    const maxCount = Math.max(1, ...bars.map((b) => b.count));
+                    return (
+                      <div>
+                        <p className="text-sm font-semibold text-gray-700 mb-3">
+                          {histData.kind === "numeric" ? `Histogram: ${histColumn}` : `Top values: ${histColumn}`}
+                        </p>
+                        <div className="space-y-1 max-h-96 overflow-y-auto">
+                          {bars.map((b, i) => (
+                            <div key={i} className="flex items-center text-xs">
+                              <span className="w-40 shrink-0 truncate text-gray-600 pr-2 text-right" title={b.label}>{b.label}</span>
+                              <div className="flex-1 bg-gray-100 rounded h-4">
+                                <div className="bg-blue-500 h-4 rounded" style={{ width: `${(b.count / maxCount) * 100}%` }} />
+                              </div>
+                              <span className="w-12 shrink-0 text-gray-500 pl-2">{b.count}</span>
+                            </div>
+                          ))}
+                        </div>
+                      </div>
+                    );
+                  })()
                 ) : (
                   <p className="text-gray-500 text-center py-8">Select a column from the summary table to view its chart.</p>
                 )}